@@ -22,6 +22,10 @@ def BitmapFactory(*args, instantiate: bool = False):
     return _class_call(autoclass('android.graphics.BitmapFactory'), args, instantiate)
 
 
+def BitmapFactoryOptions(*args, instantiate: bool = False):
+    return _class_call(autoclass('android.graphics.BitmapFactory$Options'), args, instantiate)
+
+
 def Config(*args, instantiate: bool = False):
     return _class_call(autoclass("android.graphics.Bitmap$Config"), args, instantiate)
 
@@ -22,3 +22,7 @@ def AudioAttributesBuilder(instantiate: bool = False, *args):
     return _class_call(
         autoclass("android.media.AudioAttributes$Builder"), args, instantiate
     )
+
+
+def MediaMetadataRetriever(*args, instantiate: bool = False):
+    return _class_call(autoclass("android.media.MediaMetadataRetriever"), args, instantiate)
@@ -28,3 +28,7 @@ def WindowInsetsController(*args, instantiate: bool = False):
 
 def Gravity(*args, instantiate: bool = False):
     return _class_call(autoclass('android.view.Gravity'), args, instantiate)
+
+
+def Choreographer(*args, instantiate: bool = False):
+    return _class_call(autoclass('android.view.Choreographer'), args, instantiate)
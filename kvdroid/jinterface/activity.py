@@ -12,3 +12,104 @@ class ActivityResultCallback(PythonJavaClass):
     @java_method("(Ljava/lang/Object;)V")
     def onActivityResult(self, obj):
         self.callback(obj)
+
+
+class ActivityLifecycleCallbacks(PythonJavaClass):
+    """
+    ``Application.ActivityLifecycleCallbacks`` forwarding the main events to
+    ``callback(event, activity)``, ``event`` being one of ``"created"``,
+    ``"started"``, ``"resumed"``, ``"paused"``, ``"stopped"``,
+    ``"save_instance_state"`` or ``"destroyed"``.
+    """
+    __javainterfaces__ = ["android/app/Application$ActivityLifecycleCallbacks"]
+    __javacontext__ = "app"
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    @java_method("(Landroid/app/Activity;Landroid/os/Bundle;)V")
+    def onActivityCreated(self, activity, bundle):
+        self.callback("created", activity)
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityStarted(self, activity):
+        self.callback("started", activity)
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityResumed(self, activity):
+        self.callback("resumed", activity)
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPaused(self, activity):
+        self.callback("paused", activity)
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityStopped(self, activity):
+        self.callback("stopped", activity)
+
+    @java_method("(Landroid/app/Activity;Landroid/os/Bundle;)V")
+    def onActivitySaveInstanceState(self, activity, bundle):
+        self.callback("save_instance_state", activity)
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityDestroyed(self, activity):
+        self.callback("destroyed", activity)
+
+    # default methods added in API 29, proxies are called for them as well
+
+    @java_method("(Landroid/app/Activity;Landroid/os/Bundle;)V")
+    def onActivityPreCreated(self, activity, bundle):
+        pass
+
+    @java_method("(Landroid/app/Activity;Landroid/os/Bundle;)V")
+    def onActivityPostCreated(self, activity, bundle):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPreStarted(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPostStarted(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPreResumed(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPostResumed(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPrePaused(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPostPaused(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPreStopped(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPostStopped(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;Landroid/os/Bundle;)V")
+    def onActivityPreSaveInstanceState(self, activity, bundle):
+        pass
+
+    @java_method("(Landroid/app/Activity;Landroid/os/Bundle;)V")
+    def onActivityPostSaveInstanceState(self, activity, bundle):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPreDestroyed(self, activity):
+        pass
+
+    @java_method("(Landroid/app/Activity;)V")
+    def onActivityPostDestroyed(self, activity):
+        pass
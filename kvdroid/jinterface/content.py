@@ -0,0 +1,20 @@
+from jnius import PythonJavaClass, java_method
+
+
+class ComponentCallbacks(PythonJavaClass):
+    __javainterfaces__ = ["android/content/ComponentCallbacks"]
+    __javacontext__ = "app"
+
+    def __init__(self, on_configuration_changed, on_low_memory=None):
+        super().__init__()
+        self.on_configuration_changed = on_configuration_changed
+        self.on_low_memory = on_low_memory
+
+    @java_method("(Landroid/content/res/Configuration;)V")
+    def onConfigurationChanged(self, new_config):
+        self.on_configuration_changed(new_config)
+
+    @java_method("()V")
+    def onLowMemory(self):
+        if self.on_low_memory:
+            self.on_low_memory()
@@ -0,0 +1,14 @@
+from jnius import PythonJavaClass, java_method
+
+
+class Runnable(PythonJavaClass):
+    __javainterfaces__ = ["java/lang/Runnable"]
+    __javacontext__ = "app"
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    @java_method("()V")
+    def run(self):
+        self.callback()
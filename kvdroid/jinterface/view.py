@@ -1,4 +1,4 @@
-from typing import Callable
+from typing import Callable, NamedTuple
 from jnius import PythonJavaClass, java_method
 from enum import Enum
 from kvdroid.jclass.androidx import WindowInsetsCompatType, WindowInsetsCompat
@@ -6,33 +6,42 @@ from kvdroid.jclass.androidx import WindowInsetsCompatType, WindowInsetsCompat
 
 class WindowInsetsType(Enum):
     SYSTEM_BARS = "systemBars"
+    STATUS_BARS = "statusBars"
+    NAVIGATION_BARS = "navigationBars"
+    IME = "ime"
     SYSTEM_GESTURES = "systemGestures"
     MANDATORY_SYSTEM_GESTURES = "mandatorySystemGestures"
     TAPPABLE_ELEMENT = "tappableElement"
     DISPLAY_CUTOUT = "displayCutout"
 
 
-class Insets:
-    __slots__ = ("insets",)
+def insets_type_mask(
+    insets_type: WindowInsetsType | tuple[WindowInsetsType, ...],
+) -> int:
+    """
+    Resolve a ``WindowInsetsType`` (or a tuple of them) to the
+    ``WindowInsetsCompat.Type`` bit mask expected by ``getInsets``.
+    Resolve it once and keep the int, it costs a JNI call per type.
+    """
+    if isinstance(insets_type, tuple):
+        mask = 0
+        for _type in insets_type:
+            mask |= getattr(WindowInsetsCompatType(), _type.value)()
+        return mask
+    return getattr(WindowInsetsCompatType(), insets_type.value)()
 
-    def __init__(self, insets):
-        self.insets = insets
 
-    @property
-    def top(self):
-        return self.insets.top
+class Insets(NamedTuple):
+    """Plain Python copy of an ``androidx.core.graphics.Insets``."""
 
-    @property
-    def bottom(self):
-        return self.insets.bottom
+    top: int
+    bottom: int
+    left: int
+    right: int
 
-    @property
-    def left(self):
-        return self.insets.left
-
-    @property
-    def right(self):
-        return self.insets.right
+    @classmethod
+    def from_java(cls, insets):
+        return cls(insets.top, insets.bottom, insets.left, insets.right)
 
 
 class OnApplyWindowInsetsListener(PythonJavaClass):
@@ -43,12 +52,13 @@ class OnApplyWindowInsetsListener(PythonJavaClass):
         self,
         callback: Callable[[Insets], None],
         insets_type: (
-            WindowInsetsType | tuple[WindowInsetsType, WindowInsetsType]
+            WindowInsetsType | tuple[WindowInsetsType, ...]
         ) = WindowInsetsType.SYSTEM_BARS,
     ):
         super().__init__()
         self.callback = callback
         self.insets_type = insets_type
+        self.insets_mask = insets_type_mask(insets_type)
         self.__CONSUMED = WindowInsetsCompat().CONSUMED
 
     @java_method(
@@ -61,14 +71,49 @@ class OnApplyWindowInsetsListener(PythonJavaClass):
         returns: android.view.WindowInsets
         """
 
-        if isinstance(self.insets_type, tuple):
-            inset_type = (
-                getattr(WindowInsetsCompatType(), self.insets_type[0].value)()
-                | getattr(WindowInsetsCompatType(), self.insets_type[1].value)()
-            )
-        else:
-            inset_type = getattr(WindowInsetsCompatType(), self.insets_type.value)()
-        insets = window_insets.getInsets(inset_type)
-        self.callback(Insets(insets))
+        insets = window_insets.getInsets(self.insets_mask)
+        self.callback(Insets.from_java(insets))
 
         return self.__CONSUMED
+
+
+class WindowInsetsCompatListener(PythonJavaClass):
+    """
+    Same interface as :class:`OnApplyWindowInsetsListener`, but forwards the
+    raw ``WindowInsetsCompat`` so the receiver decides when (and how often)
+    to read values out of it.
+    """
+
+    __javainterfaces__ = ["androidx/core/view/OnApplyWindowInsetsListener"]
+    __javacontext__ = "app"
+
+    def __init__(
+        self,
+        callback: Callable[[object], None],
+        consume: bool | Callable[[], bool] = True,
+    ):
+        super().__init__()
+        self.callback = callback
+        # a callable is asked on every dispatch
+        self.__consume = consume if callable(consume) else (lambda: consume)
+        self.__CONSUMED = WindowInsetsCompat().CONSUMED
+
+    @java_method(
+        "(Landroid/view/View;Landroidx/core/view/WindowInsetsCompat;)Landroidx/core/view/WindowInsetsCompat;"
+    )
+    def onApplyWindowInsets(self, _, window_insets):
+        self.callback(window_insets)
+        return self.__CONSUMED if self.__consume() else window_insets
+
+
+class FrameCallback(PythonJavaClass):
+    __javainterfaces__ = ["android/view/Choreographer$FrameCallback"]
+    __javacontext__ = "app"
+
+    def __init__(self, callback: Callable[[int], None]):
+        super().__init__()
+        self.callback = callback
+
+    @java_method("(J)V")
+    def doFrame(self, frame_time_nanos):
+        self.callback(frame_time_nanos)
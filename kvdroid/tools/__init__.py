@@ -463,6 +463,11 @@ def keyboard_height():
     Returns:
         int: The height of the keyboard in pixels. Returns 0 if the calculation is
         unsuccessful.
+
+    Note:
+        Every call walks the decor view. To follow the keyboard every frame, use
+        :data:`kvdroid.tools.keyboard.keyboard_tracker`, which pushes changes and
+        caches the last height.
     """
     try:
         rect = Rect(instantiate=True)
@@ -488,7 +493,15 @@ def check_keyboard_visibility_and_get_height():
         tuple[bool, int]: A tuple where the first element is a boolean indicating
         whether the keyboard is visible, and the second element is an integer
         representing the height of the keyboard in pixels.
+
+    Note:
+        Once :data:`kvdroid.tools.keyboard.keyboard_tracker` has received the
+        IME insets, its cached values are returned without any JNI call.
     """
+    from kvdroid.tools.keyboard import keyboard_tracker
+
+    if keyboard_tracker.ready:
+        return keyboard_tracker.visible, keyboard_tracker.target_height
 
     view = activity.getWindow().getDecorView()
     insets = ViewCompat().getRootWindowInsets(view)
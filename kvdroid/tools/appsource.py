@@ -1,4 +1,5 @@
 from kvdroid import activity
+from kvdroid.tools.path import paths
 
 
 def app_source():
@@ -18,12 +19,6 @@ def app_info(info: str):
 
 
 def app_dirs(directory: str):
-    dirs = {
-        "files": activity.getFilesDir().getAbsolutePath(),
-        "cache": activity.getCacheDir().getAbsolutePath(),
-        "app": f"{activity.getFilesDir().getAbsolutePath()}/app",
-        "ext_files": activity.getExternalFilesDir(None).getAbsolutePath(),
-        "ext_cache": activity.getExternalCacheDir().getAbsolutePath(),
-        "data": activity.getFilesDir().getParent(),
-    }
-    return dirs[directory] if directory in dirs else None
+    if directory not in ("files", "cache", "app", "ext_files", "ext_cache", "data"):
+        return None
+    return getattr(paths, directory)
@@ -1,6 +1,10 @@
 # -------------------------------------------------------------------
 # Broadcast receiver bridge
 import logging
+from collections.abc import Mapping
+from threading import RLock
+from time import monotonic
+from typing import NamedTuple
 
 from jnius import autoclass, PythonJavaClass, java_method  # NOQA
 from android.config import JNI_NAMESPACE  # NOQA
@@ -8,11 +12,448 @@ from android.config import JNI_NAMESPACE  # NOQA
 from kvdroid.jclass.androidx import ContextCompat
 from kvdroid.jclass.org import GenericBroadcastReceiver
 from kvdroid.jclass.android import IntentFilter, HandlerThread, Intent, Handler
+from kvdroid.jinterface.lang import Runnable
 from kvdroid import activity
 
 logger = logging.getLogger("BroadcastReceiver")
 logger.setLevel(logging.DEBUG)
 
+_PYTHON_VALUES = (str, int, float, bool, bytes, bytearray, list, tuple)
+_BOXED_VALUES = {
+    "java.lang.Integer": "intValue",
+    "java.lang.Long": "longValue",
+    "java.lang.Short": "shortValue",
+    "java.lang.Byte": "byteValue",
+    "java.lang.Float": "floatValue",
+    "java.lang.Double": "doubleValue",
+    "java.lang.Boolean": "booleanValue",
+    "java.lang.Character": "charValue",
+}
+
+
+def _to_python(value):
+    # pyjnius already converts strings and most boxed primitives; unbox the rest
+    # and keep any other Java object (Parcelable, arrays, Bundles...) as it is
+    if value is None or isinstance(value, _PYTHON_VALUES):
+        return value
+    try:
+        unbox = _BOXED_VALUES.get(value.getClass().getName())
+    except AttributeError:
+        return value
+    return getattr(value, unbox)() if unbox else value
+
+
+class IntentView(Mapping):
+    """
+    Read-only, dict-like view over an ``android.content.Intent``.
+
+    The extras ``Bundle`` is decoded lazily, on first access, in one pass
+    (``keySet()`` once, then one ``get()`` per key). Primitive and string
+    values become Python values, and the result is cached. Later lookups are
+    plain dict reads instead of ``getIntExtra``/``getStringExtra`` JNI calls.
+    Values that have no Python equivalent stay Java objects. The raw intent is
+    still available as :attr:`intent`.
+
+    Example:
+        >>> def on_battery(context, intent):
+        ...     level = intent.get("level", -1)
+        ...     plugged = intent["plugged"]
+        >>> BroadcastReceiver(on_battery, actions=["BATTERY_CHANGED"], intent_view=True)
+    """
+
+    __slots__ = ("intent", "_action", "_data", "_extras")
+
+    _UNSET = object()
+
+    def __init__(self, intent, action=_UNSET):
+        self.intent = intent
+        self._action = action
+        self._data = self._UNSET
+        self._extras = None
+
+    @property
+    def action(self):
+        if self._action is self._UNSET:
+            self._action = self.intent.getAction()
+        return self._action
+
+    @property
+    def data(self):
+        """The intent data URI as a string, or None."""
+        if self._data is self._UNSET:
+            self._data = self.intent.getDataString()
+        return self._data
+
+    @property
+    def extras(self) -> dict:
+        if self._extras is None:
+            extras = {}
+            bundle = self.intent.getExtras()
+            if bundle is not None:
+                for key in bundle.keySet().toArray():
+                    extras[key] = _to_python(bundle.get(key))
+            self._extras = extras
+        return self._extras
+
+    def __getitem__(self, key):
+        return self.extras[key]
+
+    def __iter__(self):
+        return iter(self.extras)
+
+    def __len__(self):
+        return len(self.extras)
+
+    def __repr__(self):
+        return f"IntentView(action={self.action!r}, extras={self.extras!r})"
+
+
+class DeliveryPolicy(NamedTuple):
+    """How often a broadcast action may reach a :class:`BroadcastReceiver` callback.
+
+    Attributes:
+        throttle (float): Deliver at most one broadcast per ``throttle``
+            seconds. Broadcasts arriving inside the window are dropped, or,
+            with ``latest_only``, the newest one is delivered when the
+            window closes.
+        debounce (float): Wait until the action has been quiet for
+            ``debounce`` seconds, then deliver only the newest broadcast.
+            Takes precedence over ``throttle``.
+        latest_only (bool): Coalesce bursts: while a delivery is pending,
+            a newer broadcast replaces it instead of being queued. On its own
+            it collapses broadcasts that pile up in the hub's looper.
+    """
+
+    throttle: float = 0.0
+    debounce: float = 0.0
+    latest_only: bool = False
+
+
+class DeliveryStats(NamedTuple):
+    received: int = 0
+    delivered: int = 0
+    dropped: int = 0
+
+
+class _DeliveryGate(object):
+    # Per receiver, per action. Every method runs on the hub's handler thread.
+
+    __slots__ = (
+        "receiver",
+        "policy",
+        "immediate",
+        "received",
+        "delivered",
+        "dropped",
+        "last_delivery",
+        "pending",
+        "handler",
+        "runnable",
+    )
+
+    def __init__(self, receiver, policy: DeliveryPolicy):
+        self.receiver = receiver
+        self.policy = policy
+        self.immediate = not (policy.throttle or policy.debounce or policy.latest_only)
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.last_delivery = None
+        self.pending = None
+        self.handler = None
+        self.runnable = None
+
+    @property
+    def stats(self):
+        return DeliveryStats(self.received, self.delivered, self.dropped)
+
+    def offer(self, context, intent):
+        self.received += 1
+        if self.immediate:
+            self.deliver(context, intent)
+            return
+        policy = self.policy
+        if policy.debounce:
+            self._hold(context, intent)
+            self._schedule(policy.debounce, restart=True)
+            return
+        if policy.throttle:
+            wait = 0.0
+            if self.last_delivery is not None:
+                wait = self.last_delivery + policy.throttle - monotonic()
+            if wait <= 0 and self.pending is None:
+                self.deliver(context, intent)
+            elif policy.latest_only:
+                self._hold(context, intent)
+                self._schedule(wait)
+            else:
+                self.dropped += 1
+            return
+        self._hold(context, intent)
+        self._schedule(0)
+
+    def deliver(self, context, intent):
+        self.last_delivery = monotonic()
+        self.delivered += 1
+        self.receiver.dispatch(context, intent)
+
+    def cancel(self):
+        if self.handler is not None:
+            self.handler.removeCallbacks(self.runnable)
+            self.handler = None
+        if self.pending is not None:
+            self.pending = None
+            self.dropped += 1
+
+    def _hold(self, context, intent):
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = (context, intent)
+
+    def _schedule(self, delay, restart=False):
+        if self.handler is not None:
+            if not restart:
+                return
+            self.handler.removeCallbacks(self.runnable)
+        handler = self.receiver.hub.handler
+        if handler is None:
+            return
+        if self.runnable is None:
+            self.runnable = Runnable(self._run)
+        self.handler = handler
+        handler.postDelayed(self.runnable, max(int(delay * 1000), 0))
+
+    def _run(self):
+        self.handler = None
+        pending, self.pending = self.pending, None
+        if pending is None:
+            return
+        try:
+            self.deliver(*pending)
+        except Exception as e:
+            logger.exception(f"Broadcast callback failed: {e}")
+
+
+class _Registration(object):
+    # one Android receiver, registered once for a fixed set of actions
+    __slots__ = ("actions", "listener", "receiver")
+
+    def __init__(self, actions, on_receive):
+        self.actions = actions
+        self.listener = BroadcastReceiver.Callback(on_receive)
+        self.receiver = GenericBroadcastReceiver(self.listener)
+
+
+class _Group(object):
+    # Subscribers sharing the same data schemes and categories. A filter with
+    # a data scheme no longer matches intents without data, and vice versa,
+    # so each group gets its own receivers.
+    __slots__ = ("schemes", "categories", "routes", "registrations")
+
+    def __init__(self, schemes, categories):
+        self.schemes = schemes
+        self.categories = categories
+        self.routes = {}
+        self.registrations = []
+
+    @property
+    def covered(self):
+        actions = set()
+        for registration in self.registrations:
+            actions |= registration.actions
+        return actions
+
+
+class ReceiverHub(object):
+    """
+    Multiplexes many :class:`BroadcastReceiver` subscribers over few Android receivers.
+
+    A hub owns a single ``HandlerThread`` and registers
+    ``GenericBroadcastReceiver`` objects on it. Incoming intents are fanned
+    out in Python to the subscribers of their action, so the number of Java
+    threads stays flat and an action is registered once, no matter how many
+    ``BroadcastReceiver`` objects listen to it. Subscribers with different
+    data schemes (e.g. ``"package"`` for ``PACKAGE_ADDED``) or categories use
+    separate receivers.
+
+    Registrations are never replaced: a subscriber whose actions are not
+    registered yet adds one receiver for just those actions, and a receiver
+    is unregistered only once none of its actions has a subscriber left. So
+    no broadcast is lost while subscribers come and go, and sticky
+    broadcasts such as ``BATTERY_CHANGED`` are not delivered again to the
+    existing subscribers. A new subscriber to an already registered sticky
+    action receives the current sticky intent on its own. The thread is
+    stopped when the last subscriber leaves.
+
+    Most apps only need the shared :data:`receiver_hub`. Create another hub
+    to give a group of receivers its own thread, e.g. for a receiver whose
+    callbacks are slow.
+    """
+
+    def __init__(self, name: str = "kvdroid-broadcast", context=None):
+        self.name = name
+        self.context = context or activity
+        self._lock = RLock()
+        self._subscribers = []
+        self._groups = {}
+        self._posted = set()
+        self._handler_thread = None
+        self._handler = None
+
+    @property
+    def subscribers(self):
+        return tuple(self._subscribers)
+
+    @property
+    def handler(self):
+        """``Handler`` of the hub thread, or None while the hub is idle."""
+        return self._handler
+
+    def subscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                return
+            group = self._groups.get(self._group_key(subscriber))
+            covered = group.covered if group is not None else set()
+            self._subscribers.append(subscriber)
+            self._update()
+            # the receivers already registered for these actions got their
+            # sticky intent long ago, fetch it for the new subscriber only
+            self._deliver_sticky(subscriber, subscriber.actions & covered)
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber not in self._subscribers:
+                return
+            self._subscribers.remove(subscriber)
+            self._update()
+
+    @staticmethod
+    def _group_key(subscriber):
+        return subscriber.data_schemes, subscriber.categories
+
+    def _update(self):
+        routes_by_group = {}
+        for subscriber in self._subscribers:
+            routes = routes_by_group.setdefault(self._group_key(subscriber), {})
+            for action in subscriber.actions:
+                routes[action] = routes.get(action, ()) + (subscriber,)
+
+        for key in list(self._groups):
+            if key not in routes_by_group:
+                for registration in self._groups.pop(key).registrations:
+                    self._unregister(registration)
+        if not routes_by_group:
+            self._stop_thread()
+            return
+
+        for key, routes in routes_by_group.items():
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group(*key)
+            group.routes = routes
+            for registration in list(group.registrations):
+                if not registration.actions & routes.keys():
+                    group.registrations.remove(registration)
+                    self._unregister(registration)
+            missing = frozenset(routes.keys() - group.covered)
+            if missing:
+                group.registrations.append(self._register(group, missing))
+
+    def _start_thread(self):
+        if self._handler_thread is not None:
+            return
+        self._handler_thread = HandlerThread(self.name)
+        self._handler_thread.start()
+        self._handler = Handler(self._handler_thread.getLooper())
+
+    def _stop_thread(self):
+        if self._handler_thread is None:
+            return
+        self._handler_thread.quitSafely()
+        self._handler_thread = None
+        self._handler = None
+        self._posted.clear()
+
+    @staticmethod
+    def _filter(actions, categories, schemes):
+        receiver_filter = IntentFilter(instantiate=True)
+        for action in actions:
+            receiver_filter.addAction(action)
+        for category in categories:
+            receiver_filter.addCategory(category)
+        for scheme in schemes:
+            receiver_filter.addDataScheme(scheme)
+        return receiver_filter
+
+    def _register(self, group, actions):
+        self._start_thread()
+        registration = _Registration(
+            actions, lambda context, intent: self._on_receive(group, context, intent)
+        )
+        ContextCompat().registerReceiver(
+            self.context,
+            registration.receiver,
+            self._filter(actions, group.categories, group.schemes),
+            None,
+            self._handler,
+            ContextCompat().RECEIVER_NOT_EXPORTED,
+        )
+        return registration
+
+    def _unregister(self, registration):
+        self.context.unregisterReceiver(registration.receiver)
+
+    def _deliver_sticky(self, subscriber, actions):
+        for action in actions:
+            # a null receiver only returns the current sticky intent, if any
+            intent = self.context.registerReceiver(
+                None, self._filter((action,), subscriber.categories, subscriber.data_schemes)
+            )
+            if intent is not None:
+                self._post(subscriber, intent)
+
+    def _post(self, subscriber, intent):
+        def run():
+            self._posted.discard(runnable)
+            if subscriber not in self._subscribers:
+                return
+            try:
+                subscriber.receive(self.context, IntentView(intent))
+            except Exception as e:
+                logger.exception(f"Broadcast callback failed: {e}")
+
+        # keep the Runnable alive until the looper has run it
+        runnable = Runnable(run)
+        self._posted.add(runnable)
+        self._handler.post(runnable)
+
+    def _on_receive(self, group, context, intent):
+        action = intent.getAction()
+        subscribers = group.routes.get(action)
+        if not subscribers:
+            return
+        # one view per intent: extras are decoded at most once, however many
+        # subscribers read them
+        view = IntentView(intent, action)
+        intent_categories = None
+        for subscriber in subscribers:
+            if subscriber.categories:
+                if intent_categories is None:
+                    java_categories = intent.getCategories()
+                    intent_categories = (
+                        set(java_categories.toArray()) if java_categories else set()
+                    )
+                if not intent_categories <= subscriber.categories:
+                    continue
+            try:
+                subscriber.receive(context, view)
+            except Exception as e:
+                logger.exception(f"Broadcast callback failed: {e}")
+
+
+receiver_hub = ReceiverHub()
+
 
 class BroadcastReceiver(object):
 
@@ -28,10 +469,38 @@ class BroadcastReceiver(object):
         def onReceive(self, context, intent):
             self.callback(context, intent)
 
-    def __init__(self, callback, actions=None, categories=None, use_intent_action=True):
+    def __init__(
+        self,
+        callback,
+        actions=None,
+        categories=None,
+        use_intent_action=True,
+        hub: ReceiverHub = None,
+        intent_view: bool = False,
+        policy: "DeliveryPolicy | dict[str, DeliveryPolicy]" = None,
+        data_schemes=None,
+    ):
+        """
+        Args:
+            callback: Called as ``callback(context, intent)`` on the hub thread.
+            actions: Intent actions to listen for.
+            categories: Intent categories to listen for.
+            use_intent_action: Resolve short names such as ``"BATTERY_CHANGED"``
+                to the ``Intent.ACTION_*`` constants.
+            hub: :class:`ReceiverHub` to subscribe to, :data:`receiver_hub` by default.
+            intent_view: Pass an :class:`IntentView` instead of the raw intent.
+            policy: A :class:`DeliveryPolicy` for every action, or a dict of
+                action to policy. Actions without a policy are delivered as
+                they arrive. Dropped broadcasts never reach Python callbacks
+                and their extras are never decoded.
+            data_schemes: Data schemes the intents must carry, e.g.
+                ``["package"]`` for ``PACKAGE_ADDED``/``PACKAGE_REMOVED``.
+        """
         super().__init__()
-        self.handler = None
         self.callback = callback
+        self.hub = hub or receiver_hub
+        self.intent_view = intent_view
+        self._started = False
 
         if not actions and not categories:
             raise ValueError("You need to define at least actions or categories")
@@ -52,35 +521,71 @@ class BroadcastReceiver(object):
             resolved_actions = actions or []
             resolved_categories = categories or []
 
-        # resolve android API
+        self.actions = frozenset(resolved_actions)
+        self.categories = frozenset(resolved_categories)
+        self.data_schemes = frozenset(data_schemes or ())
 
-        # create a thread for handling events from the receiver
-        self.handler_thread = HandlerThread("handlerthread")
+        if isinstance(policy, dict):
+            policies = {
+                _expand_partial_name(action) if use_intent_action else action: value
+                for action, value in policy.items()
+            }
+        else:
+            policies = dict.fromkeys(self.actions, policy)
+        self._default_policy = DeliveryPolicy()
+        self._gates = {
+            action: _DeliveryGate(self, policies.get(action) or self._default_policy)
+            for action in self.actions
+        }
 
-        # create a listener
-        self.listener = BroadcastReceiver.Callback(self.callback)
-        self.receiver = GenericBroadcastReceiver(self.listener)
-        self.receiver_filter = IntentFilter(instantiate=True)
-        for x in resolved_actions:
-            self.receiver_filter.addAction(x)
-        for x in resolved_categories:
-            self.receiver_filter.addCategory(x)
+    @property
+    def stats(self) -> DeliveryStats:
+        """Received, delivered and dropped broadcast counts across all actions."""
+        received = delivered = dropped = 0
+        for gate in tuple(self._gates.values()):
+            received += gate.received
+            delivered += gate.delivered
+            dropped += gate.dropped
+        return DeliveryStats(received, delivered, dropped)
+
+    @property
+    def stats_by_action(self) -> dict:
+        return {action: gate.stats for action, gate in tuple(self._gates.items())}
+
+    @property
+    def started(self):
+        return self._started
+
+    def receive(self, context, intent):
+        """Entry point used by the hub: apply the action's policy, then dispatch.
+
+        ``intent`` is the :class:`IntentView` the hub shares between subscribers,
+        or a raw intent.
+        """
+        if not isinstance(intent, IntentView):
+            intent = IntentView(intent)
+        action = intent.action
+        gate = self._gates.get(action)
+        if gate is None:
+            gate = self._gates[action] = _DeliveryGate(self, self._default_policy)
+        gate.offer(context, intent)
+
+    def dispatch(self, context, intent):
+        if not isinstance(intent, IntentView):
+            intent = IntentView(intent)
+        self.callback(context, intent if self.intent_view else intent.intent)
 
     def start(self):
-        if hasattr(self, "handlerthread") and self.handlerthread.isAlive():
-            logger.debug("HandlerThread already running, skipping start")
+        if self._started:
+            logger.debug("BroadcastReceiver already running, skipping start")
             return
-        self.handler_thread.start()
-        self.handler = Handler(self.handler_thread.getLooper())
-        ContextCompat().registerReceiver(
-            activity,
-            self.receiver,
-            self.receiver_filter,
-            None,
-            self.handler,
-            ContextCompat().RECEIVER_NOT_EXPORTED,
-        )
+        self.hub.subscribe(self)
+        self._started = True
 
     def stop(self):
-        activity.unregisterReceiver(self.receiver)
-        self.handler_thread.quit()
+        if not self._started:
+            return
+        self.hub.unsubscribe(self)
+        self._started = False
+        for gate in tuple(self._gates.values()):
+            gate.cancel()
@@ -0,0 +1,185 @@
+"""
+Streaming access to ``content://`` URIs.
+
+Many URIs (Google Photos, cloud providers, the photo picker...) have no file
+path, so :func:`kvdroid.tools.uri.resolve_uri` returns None for them. These can
+still be read with :func:`open_content`, which returns a regular Python file
+object without copying the content first.
+"""
+
+import io
+
+from jnius import JavaException
+
+from kvdroid import activity
+from kvdroid.jclass.android import Uri
+from kvdroid.tools.uri import query_cursor
+
+# python file mode -> ContentResolver.openFileDescriptor() mode
+_FD_MODES = {
+    "rb": "r",
+    "wb": "wt",
+    "ab": "wa",
+    "r+b": "rw",
+    "w+b": "rwt",
+}
+
+# largest Java byte[] allocated per read on the stream fallback
+CHUNK_SIZE = 256 * 1024
+
+
+def _as_uri(uri):
+    return Uri().parse(uri) if isinstance(uri, str) else uri
+
+
+def content_size(uri) -> int | None:
+    """Size of the content in bytes as reported by its provider, or None if unknown."""
+    try:
+        with query_cursor(_as_uri(uri), ["_size"]) as cursor:
+            if cursor is not None and cursor.moveToFirst() and not cursor.isNull(0):
+                return cursor.getLong(0)
+    except JavaException:
+        pass
+    return None
+
+
+class ContentInputStream(io.RawIOBase):
+    """
+    Raw, read-only file object over ``ContentResolver.openInputStream()``.
+
+    Used by :func:`open_content` when the provider cannot hand out a file
+    descriptor. Forward seeks skip bytes in the stream. Backward seeks reopen
+    it, and seeking from the end needs the size reported by the provider.
+
+    Args:
+        uri (android.net.Uri | str): The content URI.
+    """
+
+    def __init__(self, uri):
+        super().__init__()
+        self.uri = _as_uri(uri)
+        self._resolver = activity.getContentResolver()
+        self._stream = self._open()
+        self._position = 0
+        self._size = None
+
+    def _open(self):
+        stream = self._resolver.openInputStream(self.uri)
+        if stream is None:
+            raise FileNotFoundError(f"No content at {self.uri.toString()}")
+        return stream
+
+    @property
+    def size(self) -> int | None:
+        if self._size is None:
+            self._size = content_size(self.uri)
+        return self._size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def readinto(self, buffer):
+        self._checkClosed()
+        view = memoryview(buffer).cast("B")
+        length = min(len(view), CHUNK_SIZE)
+        if not length:
+            return 0
+        chunk = bytearray(length)
+        # pyjnius copies the filled Java array back into the bytearray
+        count = self._stream.read(chunk, 0, length)
+        if count <= 0:
+            return 0
+        view[:count] = chunk[:count]
+        self._position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._checkClosed()
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            if self.size is None:
+                raise io.UnsupportedOperation("content size is unknown, cannot seek from the end")
+            offset += self.size
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"invalid whence ({whence})")
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        if offset < self._position:
+            self._stream.close()
+            self._stream = self._open()
+            self._position = 0
+        while self._position < offset:
+            skipped = self._stream.skip(offset - self._position)
+            if skipped <= 0:
+                # skip() may stop early; a one-byte read tells EOF apart
+                if self._stream.read() == -1:
+                    break
+                skipped = 1
+            self._position += skipped
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._stream.close()
+            finally:
+                super().close()
+
+
+def open_content(uri, mode: str = "rb", buffering: int = io.DEFAULT_BUFFER_SIZE, use_fd: bool = True):
+    """
+    Open a ``content://`` URI as a Python binary file object.
+
+    When the provider hands out a file descriptor, it is detached from its
+    ``ParcelFileDescriptor`` and wrapped in a regular ``io.FileIO``. The
+    result has a working ``fileno()``, so ``os.read``, ``os.sendfile`` and
+    ``mmap`` can be used on it. Otherwise the content is streamed through
+    ``openInputStream()`` in chunks; that fallback is read-only.
+
+    Args:
+        uri (android.net.Uri | str): The content URI.
+        mode (str): ``"rb"``, ``"wb"``, ``"ab"``, ``"r+b"`` or ``"w+b"``.
+        buffering (int): Buffer size, or 0 for an unbuffered raw file object.
+        use_fd (bool): Try ``openFileDescriptor()`` first.
+
+    Returns:
+        io.BufferedIOBase | io.RawIOBase: The open file object, to be used as
+        a context manager.
+
+    Example:
+        >>> from kvdroid.tools.content import open_content
+        >>> with open_content(picked_uri) as f:
+        ...     header = f.read(12)
+        ...     f.seek(0)
+        ...     upload(f)
+    """
+    if mode not in _FD_MODES:
+        raise ValueError(f"Unsupported mode {mode!r}, use one of {', '.join(_FD_MODES)}")
+    uri = _as_uri(uri)
+    if use_fd:
+        try:
+            descriptor = activity.getContentResolver().openFileDescriptor(uri, _FD_MODES[mode])
+        except JavaException:
+            descriptor = None
+        if descriptor is not None:
+            # the FileIO owns the descriptor from now on and closes it
+            fd = descriptor.detachFd()
+            descriptor.close()
+            return io.open(fd, mode, buffering=buffering, closefd=True)
+    if mode != "rb":
+        raise io.UnsupportedOperation(f"{uri.toString()} has no file descriptor, it can only be read")
+    raw = ContentInputStream(uri)
+    return io.BufferedReader(raw, buffering) if buffering else raw
+
+
+def read_content(uri) -> bytes:
+    """Read the whole content of ``uri``."""
+    with open_content(uri) as file:
+        return file.read()
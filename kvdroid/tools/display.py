@@ -2,18 +2,19 @@
 
 from typing import Callable
 
+from kvdroid.jclass.android import Choreographer
 from kvdroid.jclass.androidx import WindowCompat, ViewCompat, WindowInsetsCompatType
-from kvdroid import activity
+from kvdroid import activity, Logger
 from android.runnable import run_on_ui_thread  # noqa
 
 from kvdroid.jinterface.view import (
+    FrameCallback,
     Insets,
-    OnApplyWindowInsetsListener,
+    WindowInsetsCompatListener,
     WindowInsetsType,
+    insets_type_mask,
 )
 
-__on_apply_window_insets_listener = []
-
 
 @run_on_ui_thread
 def enable_edge_to_edge():
@@ -78,21 +79,182 @@ def set_appearance_all_bar(is_light=True):
     set_appearance_light_status_bars(is_light)
 
 
+class WindowInsetsObserver:
+    """
+    Single window-insets pipeline for the activity's decor view.
+
+    One ``OnApplyWindowInsetsListener`` is installed on the decor view and
+    fans out to any number of Python listeners, each interested in one
+    ``WindowInsetsType`` (or a tuple of them). The type masks are resolved
+    once when a listener is added.
+
+    Insets dispatches are coalesced: the callback only keeps a reference to
+    the latest ``WindowInsetsCompat`` and schedules a ``Choreographer`` frame
+    callback. On that frame the values for every registered mask are copied
+    into :class:`~kvdroid.jinterface.view.Insets` tuples in one pass, and
+    listeners are called only if their value changed. Bursts, like the ones
+    fired during IME animations, therefore cost at most one delivery per frame.
+
+    Listeners are called on the UI thread. The last delivered value of each
+    type is cached and can be read for free with :meth:`get_insets`.
+
+    The insets are consumed, i.e. not passed on to the views below the decor
+    view, while at least one listener asks for it. Each listener chooses with
+    the ``consume`` argument of :meth:`add_listener`, which defaults to the
+    observer's ``consume`` attribute; a listener that only observes the
+    insets passes ``consume=False``.
+
+    Example:
+        >>> from kvdroid.tools.display import window_insets, WindowInsetsType
+        >>> def on_insets(insets):
+        ...     print(insets.top, insets.bottom)
+        >>> window_insets.add_listener(on_insets, WindowInsetsType.SYSTEM_BARS)
+        >>> window_insets.remove_listener(on_insets)
+    """
+
+    def __init__(self, consume: bool = True):
+        self.consume = consume
+        self._masks = {}
+        self._listeners = {}
+        self._consumers = {}
+        self._values = {}
+        self._latest = None
+        self._frame_pending = False
+        self._choreographer = None
+        self._insets_listener = None
+        self._frame_callback = None
+
+    @property
+    def started(self) -> bool:
+        return self._insets_listener is not None
+
+    def add_listener(
+        self,
+        listener: Callable[[Insets], None],
+        insets_type: (
+            WindowInsetsType | tuple[WindowInsetsType, ...]
+        ) = WindowInsetsType.SYSTEM_BARS,
+        consume: bool = None,
+    ):
+        """Register ``listener(insets)`` for ``insets_type`` and start the pipeline if needed.
+
+        ``consume`` tells whether this listener wants the insets consumed,
+        ``self.consume`` if None.
+        """
+        self._consumers[listener] = self.consume if consume is None else consume
+        if insets_type not in self._masks:
+            self._masks[insets_type] = insets_type_mask(insets_type)
+        mask = self._masks[insets_type]
+        listeners = self._listeners.get(mask, ())
+        if listener not in listeners:
+            self._listeners[mask] = listeners + (listener,)
+        if self._insets_listener is None:
+            self.start()
+        elif mask in self._values:
+            self._deliver_cached(listener, mask)
+        else:
+            request_apply_insets()
+        return listener
+
+    def remove_listener(self, listener: Callable[[Insets], None]):
+        """Unregister ``listener`` from every insets type it was added for."""
+        self._consumers.pop(listener, None)
+        for mask, listeners in tuple(self._listeners.items()):
+            if listener in listeners:
+                listeners = tuple(cb for cb in listeners if cb != listener)
+                if listeners:
+                    self._listeners[mask] = listeners
+                else:
+                    del self._listeners[mask]
+                    self._values.pop(mask, None)
+
+    def get_insets(
+        self,
+        insets_type: (
+            WindowInsetsType | tuple[WindowInsetsType, ...]
+        ) = WindowInsetsType.SYSTEM_BARS,
+    ):
+        """Return the last delivered insets for ``insets_type``, or None if not known yet."""
+        mask = self._masks.get(insets_type)
+        return self._values.get(mask)
+
+    @run_on_ui_thread
+    def _deliver_cached(self, listener, mask):
+        if mask in self._values:
+            listener(self._values[mask])
+
+    @run_on_ui_thread
+    def start(self):
+        if self._insets_listener is not None:
+            return
+        if self._frame_callback is None:
+            self._frame_callback = FrameCallback(self._on_frame)
+        self._insets_listener = WindowInsetsCompatListener(
+            self._on_apply_window_insets, self._consumes
+        )
+        view = activity.getWindow().getDecorView()
+        ViewCompat().setOnApplyWindowInsetsListener(view, self._insets_listener)
+        ViewCompat().requestApplyInsets(view)
+
+    @run_on_ui_thread
+    def stop(self):
+        if self._insets_listener is None:
+            return
+        ViewCompat().setOnApplyWindowInsetsListener(
+            activity.getWindow().getDecorView(), None
+        )
+        if self._frame_pending:
+            self._choreographer.removeFrameCallback(self._frame_callback)
+            self._frame_pending = False
+        self._insets_listener = None
+        self._latest = None
+        # nothing updates them any more, don't serve them from get_insets()
+        self._values.clear()
+
+    def _consumes(self):
+        return any(self._consumers.values())
+
+    def _on_apply_window_insets(self, window_insets):
+        self._latest = window_insets
+        if self._frame_pending:
+            return
+        if self._choreographer is None:
+            self._choreographer = Choreographer().getInstance()
+        self._frame_pending = True
+        self._choreographer.postFrameCallback(self._frame_callback)
+
+    def _on_frame(self, _frame_time_nanos):
+        self._frame_pending = False
+        window_insets, self._latest = self._latest, None
+        if window_insets is None:
+            return
+        for mask, listeners in tuple(self._listeners.items()):
+            insets = Insets.from_java(window_insets.getInsets(mask))
+            if self._values.get(mask) == insets:
+                continue
+            self._values[mask] = insets
+            for listener in listeners:
+                try:
+                    listener(insets)
+                except Exception as e:
+                    Logger.exception(f"Kvdroid: window insets listener failed: {e}")
+
+
+window_insets = WindowInsetsObserver()
+
+
 def set_on_apply_window_insets_listener(
     listener: Callable[[Insets], None],
     insets_type: (
-        WindowInsetsType | tuple[WindowInsetsType, WindowInsetsType]
+        WindowInsetsType | tuple[WindowInsetsType, ...]
     ) = WindowInsetsType.SYSTEM_BARS,
 ):
     # https://developer.android.com/develop/ui/views/layout/edge-to-edge#system-bars-insets
+    return window_insets.add_listener(listener, insets_type)
 
-    global __on_apply_window_insets_listener
-    on_apply_window_insets_listener = OnApplyWindowInsetsListener(listener, insets_type)
-    __on_apply_window_insets_listener.append(on_apply_window_insets_listener)
-    ViewCompat().setOnApplyWindowInsetsListener(
-        activity.getWindow().getDecorView(),
-        on_apply_window_insets_listener,
-    )
+
+def remove_on_apply_window_insets_listener(listener: Callable[[Insets], None]):
+    window_insets.remove_listener(listener)
 
 
 @run_on_ui_thread
@@ -34,7 +34,10 @@ def save_drawable(drawable, path, name):
         drawable.setBounds(0, 0, canvas.getWidth(), canvas.getHeight())
         drawable.draw(canvas)
     out = FileOutputStream(path + name + ".png")
-    bitmap.compress(CompressFormat().PNG, 90, out)
+    try:
+        bitmap.compress(CompressFormat().PNG, 90, out)
+    finally:
+        out.close()
     return path + name + ".png"
 
 
@@ -0,0 +1,208 @@
+from time import monotonic
+from typing import Callable, NamedTuple
+
+from android.runnable import run_on_ui_thread  # noqa
+
+from kvdroid import Logger
+from kvdroid.jclass.android import Choreographer
+from kvdroid.jinterface.view import FrameCallback, Insets, WindowInsetsType
+from kvdroid.tools.display import window_insets
+
+
+class KeyboardState(NamedTuple):
+    """Snapshot of the soft keyboard (IME) pushed to keyboard listeners.
+
+    Attributes:
+        visible (bool): Whether the keyboard is shown, or being shown.
+        height (int): Keyboard height in pixels. While ``estimated``, this is
+            a Python-side estimate of the animation, not the height the
+            system is drawing.
+        target_height (int): Height reported by the system insets, which the
+            keyboard is animating towards.
+        progress (float): Estimated animation progress from 0.0 to 1.0; 1.0
+            once settled.
+        estimated (bool): True on interpolated animation frames, False when
+            ``height`` comes straight from the system insets.
+    """
+
+    visible: bool
+    height: int
+    target_height: int
+    progress: float
+    estimated: bool = False
+
+
+def _ease_out(fraction: float) -> float:
+    # close to the IME's own decelerating curve
+    return 1.0 - (1.0 - fraction) ** 3
+
+
+class KeyboardTracker:
+    """
+    Push-based keyboard (IME) height tracker.
+
+    The tracker does not install an insets listener of its own: it is one
+    more subscriber of :data:`kvdroid.tools.display.window_insets`, the single
+    decor-view listener shared with every other kvdroid insets listener. It
+    subscribes with ``consume=False``, so it never makes the observer
+    consume insets that other listeners would pass on. Register
+    other insets handlers through ``window_insets.add_listener()`` rather than
+    ``ViewCompat.setOnApplyWindowInsetsListener()`` on the decor view, since a
+    view holds a single listener.
+
+    ``WindowInsetsAnimationCompat.Callback`` is an abstract class, which
+    pyjnius cannot implement, so the system's show/hide animation is not
+    observable. When the IME height changes, the tracker *estimates* the
+    animation by easing from the current height to the new one on
+    ``Choreographer`` frames; those states have ``estimated`` set and their
+    ``height`` may differ from what is on screen. ``target_height`` is always
+    the real inset. Set ``duration`` to 0 to only get real values. If the
+    platform already dispatches insets on consecutive frames, the tracker
+    follows them directly without estimating.
+
+    The last state is cached, so :attr:`visible`, :attr:`height` and
+    :attr:`progress` are free to read every frame. Listeners are called on the
+    UI thread.
+
+    Example:
+        >>> from kvdroid.tools.keyboard import keyboard_tracker
+        >>> def on_keyboard(state):
+        ...     input_bar.y = state.height
+        >>> keyboard_tracker.add_listener(on_keyboard)
+        >>> keyboard_tracker.height  # cached, no JNI
+    """
+
+    def __init__(self, duration: float = 0.25):
+        self.duration = duration
+        self._state = KeyboardState(False, 0, 0, 1.0)
+        self._listeners = ()
+        self._started = False
+        self._start_height = 0
+        self._animation_start = None
+        self._last_update = None
+        self._frame_pending = False
+        self._choreographer = None
+        self._frame_callback = None
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    @property
+    def ready(self) -> bool:
+        """True once the first IME insets have been received."""
+        return self._started and self._last_update is not None
+
+    @property
+    def state(self) -> KeyboardState:
+        return self._state
+
+    @property
+    def visible(self) -> bool:
+        return self._state.visible
+
+    @property
+    def height(self) -> int:
+        return self._state.height
+
+    @property
+    def target_height(self) -> int:
+        return self._state.target_height
+
+    @property
+    def progress(self) -> float:
+        return self._state.progress
+
+    @property
+    def estimated(self) -> bool:
+        """True while :attr:`height` is an estimate of the IME animation."""
+        return self._state.estimated
+
+    def add_listener(self, listener: Callable[[KeyboardState], None]):
+        """Call ``listener(state)`` on every keyboard change and animation frame."""
+        if listener not in self._listeners:
+            self._listeners += (listener,)
+        self.start()
+        return listener
+
+    def remove_listener(self, listener: Callable[[KeyboardState], None]):
+        self._listeners = tuple(cb for cb in self._listeners if cb != listener)
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        # the tracker only observes the insets, it never consumes them
+        window_insets.add_listener(self._on_ime_insets, WindowInsetsType.IME, consume=False)
+
+    def stop(self):
+        if not self._started:
+            return
+        self._started = False
+        self._last_update = None
+        window_insets.remove_listener(self._on_ime_insets)
+        self._cancel_frame()
+
+    @run_on_ui_thread
+    def _cancel_frame(self):
+        if self._frame_pending:
+            self._choreographer.removeFrameCallback(self._frame_callback)
+            self._frame_pending = False
+
+    def _on_ime_insets(self, insets: Insets):
+        # called on the UI thread, at most once per frame
+        target = insets.bottom
+        now = monotonic()
+        following = self._last_update is not None and now - self._last_update <= 0.05
+        self._last_update = now
+        if target == self._state.target_height:
+            return
+        if following or not self.duration:
+            if self._frame_pending:
+                self._choreographer.removeFrameCallback(self._frame_callback)
+                self._frame_pending = False
+            self._animation_start = None
+            self._set_state(KeyboardState(target > 0, target, target, 1.0))
+            return
+        self._start_height = self._state.height
+        self._animation_start = None
+        self._state = self._state._replace(visible=target > 0, target_height=target)
+        self._post_frame()
+
+    def _post_frame(self):
+        if self._frame_pending:
+            return
+        if self._choreographer is None:
+            self._choreographer = Choreographer().getInstance()
+            self._frame_callback = FrameCallback(self._on_frame)
+        self._frame_pending = True
+        self._choreographer.postFrameCallback(self._frame_callback)
+
+    def _on_frame(self, frame_time_nanos):
+        self._frame_pending = False
+        if self._animation_start is None:
+            self._animation_start = frame_time_nanos
+        elapsed = (frame_time_nanos - self._animation_start) / 1e9
+        fraction = min(elapsed / self.duration, 1.0)
+        target = self._state.target_height
+        height = round(
+            self._start_height + (target - self._start_height) * _ease_out(fraction)
+        )
+        self._set_state(
+            self._state._replace(height=height, progress=fraction, estimated=fraction < 1.0)
+        )
+        if fraction < 1.0:
+            self._post_frame()
+        else:
+            self._animation_start = None
+
+    def _set_state(self, state: KeyboardState):
+        self._state = state
+        for listener in self._listeners:
+            try:
+                listener(state)
+            except Exception as e:
+                Logger.exception(f"Kvdroid: keyboard listener failed: {e}")
+
+
+keyboard_tracker = KeyboardTracker()
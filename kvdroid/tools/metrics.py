@@ -1,34 +1,193 @@
-import re
+from typing import Callable, NamedTuple
 
-from kvdroid import activity
-from kvdroid.jclass.android.graphics import Point
+from kvdroid import activity, Logger
+from kvdroid.jclass.android import Point
+from kvdroid.jclass.android.os import Handler, Looper
+from kvdroid.jinterface.content import ComponentCallbacks
+from kvdroid.jinterface.lang import Runnable
+
+
+class DisplaySnapshot(NamedTuple):
+    """Plain Python copy of the display configuration.
+
+    Every field is read from ``Configuration``, ``DisplayMetrics`` and the
+    default display's real size in a single pass, so reading any of them
+    afterward never crosses JNI.
+    """
+
+    width_dp: int
+    height_dp: int
+    width_px: int
+    height_px: int
+    real_width: int
+    real_height: int
+    density: float
+    scaled_density: float
+    density_dpi: int
+    font_scale: float
+    orientation: int
+
+
+def _read_snapshot():
+    # every field comes from the activity's current resources, so two
+    # snapshots of the same display state always compare equal
+    resources = activity.getResources()
+    config = resources.getConfiguration()
+    metric = resources.getDisplayMetrics()
+    point = Point(instantiate=True)
+    activity.getWindowManager().getDefaultDisplay().getRealSize(point)
+    return DisplaySnapshot(
+        width_dp=config.screenWidthDp,
+        height_dp=config.screenHeightDp,
+        width_px=metric.widthPixels,
+        height_px=metric.heightPixels,
+        real_width=point.x,
+        real_height=point.y,
+        density=metric.density,
+        scaled_density=metric.scaledDensity,
+        density_dpi=metric.densityDpi,
+        font_scale=config.fontScale,
+        orientation=config.orientation,
+    )
 
 
 class Metrics(object):
-    config = activity.getResources().getConfiguration()
-    metric = activity.getResources().getDisplayMetrics()
+    """
+    Cached display metrics that stay current across configuration changes.
+
+    The first ``Metrics()`` reads the display state once and registers an
+    ``onConfigurationChanged`` hook with the application context. Every
+    other read, including the dp/px helpers, is served from a
+    :class:`DisplaySnapshot` held in Python, and the snapshot is only
+    refreshed when Android reports a configuration change (rotation,
+    resize, font scale, density, ...). The refresh is posted to the main
+    looper, so it reads the resources once they reflect the change.
+
+    The snapshot is replaced as a whole, never mutated, so it can be read
+    from any thread while the UI thread refreshes it.
+
+    Example:
+        >>> metrics = Metrics()
+        >>> metrics.width_dp(), metrics.orientation()
+        >>> metrics.dp(16)  # 16dp in pixels, pure Python
+        >>> Metrics.add_listener(lambda snapshot: print(snapshot.orientation))
+    """
+
+    _snapshot: DisplaySnapshot = None
+    _component_callbacks = None
+    _refresh_runnable = None
+    _main_handler = None
+    _listeners = []
+
+    def __init__(self):
+        Metrics.ensure_started()
+
+    @classmethod
+    def ensure_started(cls):
+        """Take the first snapshot and register the configuration hook once."""
+        if cls._snapshot is None:
+            cls._snapshot = _read_snapshot()
+        if cls._component_callbacks is None:
+            cls._component_callbacks = ComponentCallbacks(cls._on_configuration_changed)
+            activity.getApplicationContext().registerComponentCallbacks(
+                cls._component_callbacks
+            )
+        return cls._snapshot
+
+    @classmethod
+    def refresh(cls):
+        """Force a re-read of the display state and notify listeners if it changed."""
+        previous = cls._snapshot
+        cls._snapshot = snapshot = _read_snapshot()
+        if snapshot != previous:
+            for listener in tuple(cls._listeners):
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    Logger.exception(f"Kvdroid: Metrics listener failed: {e}")
+        return snapshot
+
+    @classmethod
+    def _on_configuration_changed(cls, _new_config):
+        # the activity's resources may not be updated yet while the
+        # application callbacks run; refresh once the main looper is done
+        # with the change
+        if cls._refresh_runnable is None:
+            cls._refresh_runnable = Runnable(cls.refresh)
+            cls._main_handler = Handler(Looper().getMainLooper())
+        cls._main_handler.removeCallbacks(cls._refresh_runnable)
+        cls._main_handler.post(cls._refresh_runnable)
+
+    @classmethod
+    def add_listener(cls, listener: Callable[[DisplaySnapshot], None]):
+        """Call ``listener(snapshot)`` whenever a configuration change alters the metrics."""
+        cls.ensure_started()
+        if listener not in cls._listeners:
+            cls._listeners.append(listener)
+
+    @classmethod
+    def remove_listener(cls, listener: Callable[[DisplaySnapshot], None]):
+        if listener in cls._listeners:
+            cls._listeners.remove(listener)
+
+    @classmethod
+    def snapshot(cls) -> DisplaySnapshot:
+        return cls._snapshot or cls.ensure_started()
+
+    @property
+    def config(self):
+        return activity.getResources().getConfiguration()
+
+    @property
+    def metric(self):
+        return activity.getResources().getDisplayMetrics()
 
     def height_dp(self):
-        return self.config.screenHeightDp
+        return self.snapshot().height_dp
 
     def width_dp(self):
-        return self.config.screenWidthDp
+        return self.snapshot().width_dp
 
     def height_px(self):
-        return self.metric.heightPixels
+        return self.snapshot().height_px
 
     def width_px(self):
-        return self.metric.widthPixels
+        return self.snapshot().width_px
 
     def orientation(self):
-        if self.config.orientation == 1:
+        if self.snapshot().orientation == 1:
             return "portrait"
         else:
             return "landscape"
 
     @staticmethod
     def resolution():
-        point = Point(instantiate=True)
-        activity.getWindowManager().getDefaultDisplay().getRealSize(point)
-        size = re.findall(r"\d+", point.toString())
-        return size[1] + "x" + size[0]
+        snapshot = Metrics.snapshot()
+        return f"{snapshot.real_height}x{snapshot.real_width}"
+
+    @staticmethod
+    def dp(value):
+        return dp(value)
+
+    @staticmethod
+    def sp(value):
+        return sp(value)
+
+    @staticmethod
+    def px_to_dp(value):
+        return px_to_dp(value)
+
+
+def dp(value):
+    """Convert density-independent pixels to pixels without touching JNI."""
+    return value * (Metrics._snapshot or Metrics.ensure_started()).density
+
+
+def sp(value):
+    """Convert scale-independent pixels to pixels without touching JNI."""
+    return value * (Metrics._snapshot or Metrics.ensure_started()).scaled_density
+
+
+def px_to_dp(value):
+    """Convert pixels to density-independent pixels without touching JNI."""
+    return value / (Metrics._snapshot or Metrics.ensure_started()).density
@@ -1,16 +1,202 @@
+import socket
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from math import ceil
+from threading import Lock
+from time import monotonic, perf_counter_ns
+from typing import Callable, NamedTuple
+
 from kvdroid.jclass.android import Activity
-from kvdroid import activity
+from kvdroid import activity, Logger
 from jnius import JavaException, cast
-from kvdroid.jclass.android import WifiManager, Formatter, Context
+from kvdroid.jclass.android import WifiManager, Formatter, Context, VERSION
+
+
+class NetworkState(NamedTuple):
+    """Plain Python snapshot of the default network.
+
+    Attributes:
+        connected (bool): Whether there is a default network.
+        transport (str | None): "wifi", "cellular", "ethernet", "vpn",
+            "bluetooth" or None when disconnected.
+        wifi (bool): The default network uses Wi-Fi.
+        cellular (bool): The default network uses mobile data.
+        metered (bool): The default network is metered.
+        validated (bool): Android validated internet access on the network
+            (always equal to ``connected`` below API 23).
+        downstream_kbps (int): Estimated downstream bandwidth, 0 if unknown.
+        upstream_kbps (int): Estimated upstream bandwidth, 0 if unknown.
+    """
+
+    connected: bool = False
+    transport: str = None
+    wifi: bool = False
+    cellular: bool = False
+    metered: bool = False
+    validated: bool = False
+    downstream_kbps: int = 0
+    upstream_kbps: int = 0
+
+
+# NetworkCapabilities.TRANSPORT_* values, checked in this order
+_TRANSPORTS = (
+    ("vpn", 4),
+    ("wifi", 1),
+    ("cellular", 0),
+    ("ethernet", 3),
+    ("bluetooth", 2),
+)
+_NET_CAPABILITY_NOT_METERED = 11
+_NET_CAPABILITY_VALIDATED = 16
+_TYPE_MOBILE = 0
+_TYPE_WIFI = 1
+
+__connectivity_manager = None
+
+
+def _connectivity_manager():
+    global __connectivity_manager
+    if __connectivity_manager is None:
+        __connectivity_manager = activity.getSystemService(Activity().CONNECTIVITY_SERVICE)
+    return __connectivity_manager
+
+
+def _read_network_state(con_mgr) -> NetworkState:
+    if VERSION().SDK_INT < 23:
+        info = con_mgr.getActiveNetworkInfo()
+        if info is None or not info.isConnected():
+            return NetworkState()
+        network_type = info.getType()
+        return NetworkState(
+            connected=True,
+            transport={_TYPE_WIFI: "wifi", _TYPE_MOBILE: "cellular"}.get(network_type),
+            wifi=network_type == _TYPE_WIFI,
+            cellular=network_type == _TYPE_MOBILE,
+            metered=con_mgr.isActiveNetworkMetered(),
+            validated=True,
+        )
+
+    network = con_mgr.getActiveNetwork()
+    capabilities = con_mgr.getNetworkCapabilities(network) if network else None
+    if capabilities is None:
+        return NetworkState()
+    transports = {
+        name: capabilities.hasTransport(transport) for name, transport in _TRANSPORTS
+    }
+    return NetworkState(
+        connected=True,
+        transport=next((name for name, found in transports.items() if found), None),
+        wifi=transports["wifi"],
+        cellular=transports["cellular"],
+        metered=not capabilities.hasCapability(_NET_CAPABILITY_NOT_METERED),
+        validated=capabilities.hasCapability(_NET_CAPABILITY_VALIDATED),
+        downstream_kbps=capabilities.getLinkDownstreamBandwidthKbps(),
+        upstream_kbps=capabilities.getLinkUpstreamBandwidthKbps(),
+    )
+
+
+class NetworkMonitor:
+    """
+    Connectivity state with change listeners.
+
+    While started, the monitor listens to the ``CONNECTIVITY_ACTION``
+    broadcast and calls its listeners with the new :class:`NetworkState`
+    whenever the default network connects, disconnects or switches.
+
+    ``ConnectivityManager.NetworkCallback`` is an abstract class, which
+    pyjnius cannot implement, and that broadcast is not sent for
+    capability-only changes: validation usually finishes after it, and
+    bandwidth estimates change without it. Reading :attr:`state` therefore
+    always re-reads the default network's capabilities (one binder call), so
+    ``validated`` and the bandwidth fields are never stale, and listeners are
+    notified of any change such a read reveals.
+
+    Example:
+        >>> from kvdroid.tools.network import network_monitor
+        >>> network_monitor.add_listener(lambda state: print(state.transport))
+        >>> network_monitor.state.metered
+    """
+
+    CONNECTIVITY_ACTION = "android.net.conn.CONNECTIVITY_CHANGE"
+
+    def __init__(self):
+        self._state = None
+        self._listeners = ()
+        self._receiver = None
+
+    @property
+    def started(self) -> bool:
+        return self._receiver is not None
+
+    @property
+    def state(self) -> NetworkState:
+        """The current state of the default network, read on every access."""
+        return self.refresh()
+
+    def start(self):
+        if self._receiver is not None:
+            return
+        from kvdroid.tools.broadcast import BroadcastReceiver
+
+        self._receiver = BroadcastReceiver(
+            self._on_connectivity_change,
+            actions=[self.CONNECTIVITY_ACTION],
+            use_intent_action=False,
+        )
+        self.refresh()
+        self._receiver.start()
+
+    def stop(self):
+        if self._receiver is None:
+            return
+        self._receiver.stop()
+        self._receiver = None
+
+    def refresh(self) -> NetworkState:
+        """Re-read the default network and notify listeners if it changed."""
+        previous = self._state
+        try:
+            self._state = state = _read_network_state(_connectivity_manager())
+        except JavaException as e:
+            Logger.error(f"Kvdroid: unable to read network state: {e}")
+            self._state = state = NetworkState()
+        if previous is not None and state != previous:
+            for listener in self._listeners:
+                try:
+                    listener(state)
+                except Exception as e:
+                    Logger.exception(f"Kvdroid: network listener failed: {e}")
+        return state
+
+    def add_listener(self, listener: Callable[[NetworkState], None]):
+        """Call ``listener(state)`` on every change; starts the monitor."""
+        if listener not in self._listeners:
+            self._listeners += (listener,)
+        self.start()
+        return listener
+
+    def remove_listener(self, listener: Callable[[NetworkState], None]):
+        self._listeners = tuple(cb for cb in self._listeners if cb != listener)
+
+    def _on_connectivity_change(self, _context, _intent):
+        self.refresh()
+
+
+network_monitor = NetworkMonitor()
 
 
 def network_status() -> bool:
     """
-    Checks if Mobile data or Wi-Fi network is connected
+    Checks if the device is connected to a network
+
+    While :data:`network_monitor` runs, any transport counts (Wi-Fi, mobile
+    data, ethernet, VPN...). Otherwise only Wi-Fi and mobile data are checked.
 
     :rtype: bool
     :return: network status
     """
+    if network_monitor.started:
+        return network_monitor.state.connected
     return bool(wifi_status() or mobile_status())
 
 
@@ -21,12 +207,11 @@ def wifi_status() -> bool:
     :rtype: bool
     :return: Wi-Fi status
     """
-    from kvdroid.jclass.android import ConnectivityManager
-    ConnectivityManager = ConnectivityManager()
-    con_mgr = activity.getSystemService(Activity().CONNECTIVITY_SERVICE)
+    if network_monitor.started:
+        return network_monitor.state.wifi
     try:
-        return con_mgr.getNetworkInfo(ConnectivityManager.TYPE_WIFI).isConnectedOrConnecting()
-    except JavaException:
+        return _connectivity_manager().getNetworkInfo(_TYPE_WIFI).isConnectedOrConnecting()
+    except (JavaException, AttributeError):
         return False
 
 
@@ -37,12 +222,11 @@ def mobile_status() -> bool:
     :rtype: bool
     :return: Mobile data status
     """
-    from kvdroid.jclass.android import ConnectivityManager
-    ConnectivityManager = ConnectivityManager()
-    con_mgr = activity.getSystemService(Activity().CONNECTIVITY_SERVICE)
+    if network_monitor.started:
+        return network_monitor.state.cellular
     try:
-        return con_mgr.getNetworkInfo(ConnectivityManager.TYPE_MOBILE).isConnectedOrConnecting()
-    except JavaException:
+        return _connectivity_manager().getNetworkInfo(_TYPE_MOBILE).isConnectedOrConnecting()
+    except (JavaException, AttributeError):
         return False
 
 
@@ -60,19 +244,192 @@ def get_wifi_ip_address() -> str:
     return formatter.formatIpAddress(wifi_manager.getConnectionInfo().getIpAddress())
 
 
-def network_latency() -> float:
-    import time
+__resolver_pool = None
+
+
+def _resolve(host: str, port: int, timeout: float):
+    # getaddrinfo() has no timeout of its own; a bounded pool keeps a bad DNS
+    # name from holding the caller past ``timeout``
+    global __resolver_pool
+    if __resolver_pool is None:
+        __resolver_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kvdroid-dns")
+    future = __resolver_pool.submit(socket.getaddrinfo, host, port, type=socket.SOCK_STREAM)
+    try:
+        return future.result(timeout)[0]
+    except FutureTimeoutError:
+        future.cancel()
+        raise socket.timeout(f"DNS resolution of {host} timed out")
+
+
+def _tcp_latency(host: str, port: int, timeout: float):
+    deadline = monotonic() + timeout
+    address = _resolve(host, port, timeout)
+    with socket.socket(address[0], address[1], address[2]) as sock:
+        # the connect gets what the DNS lookup left of the timeout
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            raise socket.timeout(f"DNS resolution of {host} used the whole timeout")
+        sock.settimeout(remaining)
+        start = perf_counter_ns()
+        sock.connect(address[4])
+        return (perf_counter_ns() - start) / 1e6
+
+
+def _icmp_latency(host: str, timeout: float):
     from kvdroid.jclass.java import InetAddress
-    InetAddress = InetAddress()
-    def ping(host):
-        start_time = time.time()
-        address = InetAddress.getByName(host)
-        if address.isReachable(1000):
-            end_time = time.time()
-            return (end_time - start_time) * 1000
-        else:
+
+    address = InetAddress().getByName(host)
+    start = perf_counter_ns()
+    if address.isReachable(int(timeout * 1000)):
+        return (perf_counter_ns() - start) / 1e6
+    return None
+
+
+class LatencyProber:
+    """
+    Measures latency to several hosts concurrently and keeps rolling stats.
+
+    Each host is probed on a thread pool, either with a TCP connect
+    (``method="tcp"``, pure Python; DNS resolution counts toward
+    ``timeout`` but not toward the measured latency) or with
+    ``InetAddress.isReachable`` (``method="icmp"``, ICMP echo when the
+    platform allows it). Timings use ``perf_counter_ns`` and the last
+    ``window`` samples of every host are kept to compute percentiles.
+
+    Args:
+        hosts: Host names, or ``(host, port)`` tuples for TCP probes.
+        port (int): Default TCP port. Defaults to 443.
+        method (str): "tcp" or "icmp". Defaults to "tcp".
+        timeout (float): Per-probe timeout in seconds. Defaults to 1.0.
+        window (int): Number of samples kept per host. Defaults to 20.
+        max_workers (int): Size of the probing thread pool. Defaults to 8.
+
+    Example:
+        >>> prober = LatencyProber(["edge-1.example.com", "edge-2.example.com"])
+        >>> prober.probe_all(rounds=3)
+        >>> prober.best()
+        'edge-2.example.com'
+        >>> prober.stats()["edge-2.example.com"]["p95"]
+    """
+
+    def __init__(
+        self,
+        hosts,
+        port: int = 443,
+        method: str = "tcp",
+        timeout: float = 1.0,
+        window: int = 20,
+        max_workers: int = 8,
+    ):
+        if method not in ("tcp", "icmp"):
+            raise ValueError(f"Invalid probe method '{method}'. Expected 'tcp' or 'icmp'")
+        self.port = port
+        self.method = method
+        self.timeout = timeout
+        self.window = window
+        self.max_workers = max_workers
+        self._lock = Lock()
+        self._samples = {}
+        self._failures = {}
+        self._executor = None
+        self.hosts = list(hosts)
+
+    @property
+    def hosts(self):
+        return list(self._samples)
+
+    @hosts.setter
+    def hosts(self, hosts):
+        with self._lock:
+            self._samples = {
+                host: self._samples.get(host, deque(maxlen=self.window)) for host in hosts
+            }
+            self._failures = {host: self._failures.get(host, 0) for host in hosts}
+
+    def probe(self, host):
+        """Probe ``host`` once, record the sample and return it in ms (None on failure)."""
+        try:
+            if self.method == "icmp":
+                latency = _icmp_latency(host if isinstance(host, str) else host[0], self.timeout)
+            elif isinstance(host, tuple):
+                latency = _tcp_latency(host[0], host[1], self.timeout)
+            else:
+                latency = _tcp_latency(host, self.port, self.timeout)
+        except (OSError, JavaException):
+            latency = None
+        with self._lock:
+            if latency is None:
+                self._failures[host] = self._failures.get(host, 0) + 1
+            else:
+                self._samples.setdefault(host, deque(maxlen=self.window)).append(latency)
+        return latency
+
+    def probe_all(self, rounds: int = 1):
+        """Probe every host ``rounds`` times concurrently; return the last latency per host."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="kvdroid-latency"
+            )
+        hosts = self.hosts
+        results = {}
+        for _ in range(rounds):
+            futures = {host: self._executor.submit(self.probe, host) for host in hosts}
+            results = {host: future.result() for host, future in futures.items()}
+        return results
+
+    def percentile(self, host, percent: float):
+        """Nearest-rank percentile of the recorded samples of ``host`` in ms."""
+        with self._lock:
+            samples = sorted(self._samples.get(host, ()))
+        if not samples:
             return None
-    return ping('google.com')
+        rank = max(ceil(percent / 100 * len(samples)), 1)
+        return samples[rank - 1]
+
+    def stats(self):
+        """Return ``{host: {"p50", "p95", "samples", "failures"}}``."""
+        with self._lock:
+            # hosts may be replaced concurrently, take one consistent copy
+            samples = {host: list(values) for host, values in self._samples.items()}
+            failures = dict(self._failures)
+        return {
+            host: {
+                "p50": self.percentile(host, 50),
+                "p95": self.percentile(host, 95),
+                "samples": len(values),
+                "failures": failures.get(host, 0),
+            }
+            for host, values in samples.items()
+        }
+
+    def best(self):
+        """Return the host with the lowest median latency, or None if none answered."""
+        medians = {host: self.percentile(host, 50) for host in self.hosts}
+        medians = {host: median for host, median in medians.items() if median is not None}
+        return min(medians, key=medians.get) if medians else None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def network_latency(host: str = "google.com", timeout: int = 1000, method: str = "icmp"):
+    """
+    Measures the latency to ``host`` in milliseconds.
+
+    :param host: host to probe. Defaults to "google.com"
+    :param timeout: timeout in milliseconds. Defaults to 1000
+    :param method: "icmp" (``InetAddress.isReachable``) or "tcp" (connect to port 443)
+    :rtype: float | None
+    :return: latency in milliseconds, None if the host is unreachable
+    """
+    try:
+        if method == "tcp":
+            return _tcp_latency(host, 443, timeout / 1000)
+        return _icmp_latency(host, timeout / 1000)
+    except (OSError, JavaException):
+        return None
 
 
 def get_wifi_signal() -> float:
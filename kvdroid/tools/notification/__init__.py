@@ -12,6 +12,12 @@ The notification package is organized into several modules:
     - constants: Action identifiers and intent extra keys
     - utils: Internal utility functions for notification building
     - fullscreen: Full-screen notification support for high-priority alerts
+    - progress: Progress notifications updated in place with rate-limited posts
+    - group: Grouped notification bundles with a managed InboxStyle summary
+    - template: Notification templates compiled once and rendered per message
+    - conversation: Messaging conversations updated incrementally with capped history
+    - assets: LRU cache of decoded, resized notification bitmaps
+    - profiler: Per-stage timings of notification posts
 
 Key Features:
     - Simple notification creation with rich content support
@@ -33,6 +39,34 @@ Exported Classes:
         A wrapper class for Android's NotificationManagerCompat, providing methods to
         manage notifications and notification channels.
 
+    Conversation, ConversationStore:
+        A live MessagingStyle that appends only new messages and caps its
+        history, and a store posting one notification per conversation.
+
+    NotificationAssetCache:
+        LRU cache of decoded bitmaps keyed by source and size. The shared
+        ``notification_assets`` instance backs every icon and picture setter.
+
+    NotificationProfiler:
+        Times python building, bitmap decoding, Java build() and the notify()
+        IPC of every post. Enable the shared ``notification_profiler`` to use it.
+
+    NotificationChannelRegistry:
+        Declares notification channels once and registers only the missing or
+        changed ones, in a single bulk call (Android 8.0+).
+
+    NotificationGroup:
+        Posts bursts of notifications under one group key with an auto-updated
+        InboxStyle summary, rate-limited posts and a cap on active children.
+
+    NotificationTemplate:
+        Applies the static fields of a notification once and renders only the
+        per-message fields on a cached builder.
+
+    ProgressNotification:
+        A Notification that keeps its builder, updates only changed fields and
+        rate-limits notify() calls while always posting the final value.
+
 Exported Functions:
     get_notification_reply_text(intent, key_text_reply):
         Extracts user text input from notification inline reply actions.
@@ -129,15 +163,26 @@ See Also:
 
 __all__ = (
     "Builder",
+    "Conversation",
+    "ConversationStore",
     "Notification",
+    "NotificationAssetCache",
     "NotificationChannel",
+    "NotificationChannelRegistry",
+    "NotificationGroup",
     "NotificationManagerCompat",
+    "NotificationProfiler",
+    "NotificationTemplate",
+    "ProgressNotification",
     "get_notification_reply_text",
+    "notification_assets",
+    "notification_profiler",
     "Intent",
     "PendingIntent",
     "Importance",
     "Default",
     "Foreground",
+    "GroupAlert",
     "Priority",
     "PendingIntentFlag",
 )
@@ -149,11 +194,19 @@ from .notification import (
     NotificationChannel,
     get_notification_reply_text,
 )
+from .assets import NotificationAssetCache, notification_assets
+from .channel import NotificationChannelRegistry
+from .profiler import NotificationProfiler, notification_profiler
+from .conversation import Conversation, ConversationStore
+from .group import NotificationGroup
+from .progress import ProgressNotification
+from .template import NotificationTemplate
 from .utils import Intent, PendingIntent
 from .constants import (
     Importance,
     Default,
     Foreground,
+    GroupAlert,
     Priority,
     PendingIntentFlag,
 )
@@ -0,0 +1,204 @@
+"""
+Decoded bitmap cache for notification icons and pictures.
+
+Every ``get_bitmap`` call decodes its image from scratch, so the same avatar is
+decoded again for every chat notification. ``NotificationAssetCache`` keeps
+decoded bitmaps keyed by resource ID or file path and target size. Images are
+downsampled while decoding and scaled down to fit a target size, e.g. the
+platform's large icon dimensions. Memory is capped by evicting the least recently used
+bitmaps.
+
+Java ``InputStream`` sources cannot be keyed or read twice. They are decoded
+as before and never cached.
+"""
+
+__all__ = ("NotificationAssetCache", "notification_assets", "LARGE_ICON", "BIG_PICTURE")
+
+from collections import OrderedDict
+from threading import RLock, Thread
+
+from kvdroid import activity, Logger
+from kvdroid.jclass.android import Bitmap, BitmapFactoryOptions, Dimen
+from kvdroid.tools.graphics import BitmapFactory, get_bitmap
+from kvdroid.tools.notification.profiler import notification_profiler
+
+# size marker resolved to android.R.dimen.notification_large_icon_width/height
+LARGE_ICON = "large_icon"
+# size marker for BigPictureStyle pictures: the screen width at a 2:1 ratio,
+# the shape the expanded notification crops pictures to
+BIG_PICTURE = "big_picture"
+
+
+def _sample_size(width, height, target_width, target_height):
+    sample_size = 1
+    while (
+        width // (sample_size * 2) >= target_width
+        and height // (sample_size * 2) >= target_height
+    ):
+        sample_size *= 2
+    return sample_size
+
+
+class NotificationAssetCache:
+    """
+    LRU cache of decoded, resized bitmaps.
+
+    Args:
+        max_bytes (int): Memory budget for the cached bitmaps, measured with
+            ``Bitmap.getAllocationByteCount()``.
+
+    Example:
+        >>> from kvdroid.tools.notification.assets import notification_assets, LARGE_ICON
+        >>> notification_assets.warm_up(["avatars/alice.png", "avatars/bob.png"], LARGE_ICON)
+        >>> bitmap = notification_assets.get("avatars/alice.png", LARGE_ICON)  # no decode
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = RLock()
+        self._bitmaps = OrderedDict()
+        self._bytes = 0
+        self._large_icon_size = None
+        self._big_picture_size = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        """Bytes currently used by the cached bitmaps."""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._bitmaps)
+
+    def large_icon_size(self) -> tuple:
+        """The platform notification large icon size, in pixels."""
+        if self._large_icon_size is None:
+            resources = activity.getResources()
+            self._large_icon_size = (
+                resources.getDimensionPixelSize(Dimen().notification_large_icon_width),
+                resources.getDimensionPixelSize(Dimen().notification_large_icon_height),
+            )
+        return self._large_icon_size
+
+    def big_picture_size(self) -> tuple:
+        """Bounding box for big pictures, in pixels."""
+        if self._big_picture_size is None:
+            metrics = activity.getResources().getDisplayMetrics()
+            width = min(metrics.widthPixels, metrics.heightPixels)
+            self._big_picture_size = (width, width // 2)
+        return self._big_picture_size
+
+    def get(self, source: int | str | object, size: tuple | str = None):
+        """
+        Return the bitmap for ``source``, decoding it on a cache miss.
+
+        Args:
+            source (int | str | object): Drawable resource ID, file path, or a
+                Java InputStream (not cached).
+            size (tuple | str, optional): ``(width, height)`` box to fit the
+                image in, :data:`LARGE_ICON`, :data:`BIG_PICTURE`, or None for
+                the original size. Without a size, full-resolution bitmaps
+                count against the cache budget.
+
+        Returns:
+            android.graphics.Bitmap: The decoded bitmap, or None if it could
+            not be decoded.
+        """
+        if not isinstance(source, (int, str)):
+            with notification_profiler.measure("bitmap_decode"):
+                return get_bitmap(source)
+        if size == LARGE_ICON:
+            size = self.large_icon_size()
+        elif size == BIG_PICTURE:
+            size = self.big_picture_size()
+        key = (source, size)
+        with self._lock:
+            bitmap = self._bitmaps.get(key)
+            if bitmap is not None:
+                self._bitmaps.move_to_end(key)
+                self.hits += 1
+                return bitmap
+            self.misses += 1
+        with notification_profiler.measure("bitmap_decode"):
+            bitmap = self._decode(source, size)
+        if bitmap is not None:
+            self._store(key, bitmap)
+        return bitmap
+
+    def warm_up(self, sources, size: tuple | str = None, background: bool = True):
+        """
+        Decode ``sources`` ahead of time, by default on a background thread.
+
+        Returns:
+            threading.Thread | None: The warm-up thread, if ``background``.
+        """
+        sources = tuple(sources)
+
+        def _warm_up():
+            for source in sources:
+                try:
+                    self.get(source, size)
+                except Exception as e:
+                    Logger.exception(f"Kvdroid: could not preload {source}: {e}")
+
+        if not background:
+            _warm_up()
+            return None
+        thread = Thread(target=_warm_up, name="kvdroid-notification-assets", daemon=True)
+        thread.start()
+        return thread
+
+    def invalidate(self, source: int | str = None):
+        """Drop every size of ``source``, or the whole cache if None."""
+        with self._lock:
+            for key in [k for k in self._bitmaps if source is None or k[0] == source]:
+                self._bytes -= self._bitmaps.pop(key).getAllocationByteCount()
+
+    def _store(self, key, bitmap):
+        with self._lock:
+            previous = self._bitmaps.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.getAllocationByteCount()
+            self._bitmaps[key] = bitmap
+            self._bytes += bitmap.getAllocationByteCount()
+            # evicted bitmaps may still back a posted notification, so they
+            # are only dereferenced, never recycled
+            while self._bytes > self.max_bytes and len(self._bitmaps) > 1:
+                _, evicted = self._bitmaps.popitem(last=False)
+                self._bytes -= evicted.getAllocationByteCount()
+
+    @staticmethod
+    def _decode(source, size):
+        if size is None:
+            return get_bitmap(source)
+        target_width, target_height = size
+        options = BitmapFactoryOptions(instantiate=True)
+        options.inJustDecodeBounds = True
+        if isinstance(source, int):
+            BitmapFactory.decodeResource(activity.getResources(), source, options)
+        else:
+            BitmapFactory.decodeFile(source, options)
+        if options.outWidth <= 0 or options.outHeight <= 0:
+            return None
+        options.inSampleSize = _sample_size(
+            options.outWidth, options.outHeight, target_width, target_height
+        )
+        options.inJustDecodeBounds = False
+        if isinstance(source, int):
+            bitmap = BitmapFactory.decodeResource(activity.getResources(), source, options)
+        else:
+            bitmap = BitmapFactory.decodeFile(source, options)
+        if bitmap is None:
+            return None
+        # fit inside the target size, keeping the aspect ratio; never upscale
+        width, height = bitmap.getWidth(), bitmap.getHeight()
+        scale = min(target_width / width, target_height / height)
+        if scale < 1:
+            bitmap = Bitmap().createScaledBitmap(
+                bitmap, max(round(width * scale), 1), max(round(height * scale), 1), True
+            )
+        return bitmap
+
+
+notification_assets = NotificationAssetCache()
@@ -3,7 +3,7 @@ __all__ = ("Builder", "Person")
 from abc import ABC, abstractmethod
 
 from kvdroid.jclass.androidx import PersonBuilder, IconCompat
-from kvdroid.tools.graphics import get_bitmap
+from kvdroid.tools.notification.assets import notification_assets, LARGE_ICON
 
 
 class Builder(ABC):
@@ -83,7 +83,7 @@ class Person(Builder):
         Returns:
             Person: This Person instance for method chaining.
         """
-        bitmap = get_bitmap(icon)
+        bitmap = notification_assets.get(icon, LARGE_ICON)
         icon = IconCompat().createWithBitmap(bitmap)
         self.builder.setIcon(icon)
         return self
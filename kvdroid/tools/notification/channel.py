@@ -0,0 +1,113 @@
+"""
+Idempotent notification channel registration.
+
+Declare the app's channels once in a ``NotificationChannelRegistry`` and call
+``sync()`` at every start. The registry reads the existing channels with one
+``getNotificationChannels()`` call. It then sends only the missing or changed
+channels back in one ``createNotificationChannels()`` call, so an unchanged
+app start does a single read instead of one IPC per channel. Repeated syncs in
+the same process skip IPC entirely.
+"""
+
+__all__ = ("NotificationChannelRegistry",)
+
+from collections import OrderedDict
+
+from kvdroid import require_api
+from kvdroid.tools.notification.notification import (
+    NotificationChannel,
+    NotificationManagerCompat,
+)
+
+
+def _text(value):
+    # CharSequence getters come back as Java objects
+    if value is None or isinstance(value, str):
+        return value
+    return value.toString()
+
+
+def _signature(channel) -> tuple:
+    # name, description and group are the only fields an app can update once
+    # the channel exists; importance, sound, vibration... belong to the user
+    return (
+        _text(channel.getName()),
+        _text(channel.getDescription()),
+        channel.getGroup(),
+    )
+
+
+@require_api(">=", 26)
+class NotificationChannelRegistry:
+    """
+    Declares notification channels and registers only what changed.
+
+    Args:
+        manager (NotificationManagerCompat, optional): Manager to register
+            channels with. Defaults to one for the current activity.
+
+    Example:
+        >>> registry = NotificationChannelRegistry().declare(
+        ...     NotificationChannel("messages", "Messages", Importance.HIGH),
+        ...     NotificationChannel("downloads", "Downloads", Importance.LOW),
+        ... )
+        >>> registry.sync()  # ('messages', 'downloads') first run, () afterward
+    """
+
+    def __init__(self, manager: NotificationManagerCompat = None):
+        self.manager = manager or NotificationManagerCompat()
+        self._declared = OrderedDict()
+        self._synced = {}
+
+    @property
+    def channels(self) -> tuple:
+        """The declared channels, in declaration order."""
+        return tuple(self._declared.values())
+
+    def declare(self, *channels: NotificationChannel):
+        """
+        Add or replace channel declarations. Nothing is registered until :meth:`sync`.
+
+        Returns:
+            NotificationChannelRegistry: This instance for method chaining.
+        """
+        for channel in channels:
+            self._declared[channel.channel.getId()] = channel
+        return self
+
+    def sync(self, delete_undeclared: bool = False) -> tuple:
+        """
+        Create missing channels and update changed ones.
+
+        Args:
+            delete_undeclared (bool): Also delete existing channels that are
+                not declared in this registry.
+
+        Returns:
+            tuple[str, ...]: IDs of the channels that were created or updated.
+        """
+        wanted = {
+            channel_id: _signature(channel.channel)
+            for channel_id, channel in self._declared.items()
+        }
+        if wanted == self._synced and not delete_undeclared:
+            return ()
+
+        existing = {
+            channel.getId(): _signature(channel)
+            for channel in self.manager.get_notification_channels()
+        }
+        changed = [
+            channel_id
+            for channel_id, signature in wanted.items()
+            if existing.get(channel_id) != signature
+        ]
+        if changed:
+            self.manager.create_notification_channels(
+                self._declared[channel_id] for channel_id in changed
+            )
+        if delete_undeclared:
+            for channel_id in existing.keys() - wanted.keys():
+                self.manager.delete_notification_channel(channel_id)
+        self._synced = wanted
+        return tuple(changed)
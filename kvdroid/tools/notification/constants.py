@@ -138,6 +138,12 @@ class Foreground(IntFlag):
     SERVICE_IMMEDIATE = 1
 
 
+class GroupAlert(IntFlag):
+    ALL = 0
+    SUMMARY = 1
+    CHILDREN = 2
+
+
 class Priority(IntFlag):
     DEFAULT = 0
     HIGH = 1
@@ -0,0 +1,253 @@
+"""
+Conversation notifications with incremental MessagingStyle updates.
+
+``Conversation`` keeps one live ``NotificationCompat.MessagingStyle`` and the
+message history in Python. A new message is appended to the style on its own,
+and the oldest ones are trimmed past the count and byte caps. Each update
+therefore costs one ``addMessage`` call instead of rebuilding the style with
+the whole history. Participants are built into Android ``Person`` objects
+once and reused.
+
+``ConversationStore`` holds the conversations of an app and posts their
+notifications.
+"""
+
+__all__ = ("Conversation", "ConversationStore", "ConversationMessage")
+
+from collections import OrderedDict, deque
+from threading import RLock
+from typing import NamedTuple
+
+from kvdroid.jclass.androidx import NotificationCompatMessagingStyle
+from kvdroid.tools.notification.base import Person
+from kvdroid.tools.notification.notification import (
+    Notification,
+    NotificationManagerCompat,
+)
+from kvdroid.tools.notification.profiler import notification_profiler
+from kvdroid.tools.notification.styles import Style
+
+# NotificationCompat.MessagingStyle.MAXIMUM_RETAINED_MESSAGES, the style
+# drops older messages itself past this count
+MAXIMUM_RETAINED_MESSAGES = 25
+
+
+class ConversationMessage(NamedTuple):
+    text: str
+    timestamp: int
+    sender: Person = None
+    size: int = 0
+
+
+class _PersonCache:
+    # built android Person per kvdroid Person, so icons are decoded once
+    __slots__ = ("_built",)
+
+    def __init__(self):
+        self._built = {}
+
+    def get(self, person: Person):
+        if person is None:
+            return None
+        cached = self._built.get(id(person))
+        if cached is None or cached[0] is not person:
+            cached = self._built[id(person)] = (person, person.build())
+        return cached[1]
+
+    def forget(self, person: Person):
+        self._built.pop(id(person), None)
+
+
+class Conversation(Style):
+    """
+    A MessagingStyle kept alive between updates, with a capped history.
+
+    Use it anywhere a style is expected, e.g. ``Notification.set_style(conversation)``.
+
+    Args:
+        user (Person): The device user, shown as "You".
+        title (str, optional): Conversation title, for group conversations.
+        group (bool): Whether this is a group conversation.
+        max_messages (int): Maximum number of messages kept. Capped at 25, the
+            most ``MessagingStyle`` retains.
+        max_bytes (int): Maximum total UTF-8 size of the kept message texts.
+
+    Example:
+        >>> me = Person().set_name("Me")
+        >>> alice = Person().set_name("Alice").set_icon("avatars/alice.png")
+        >>> chat = Conversation(me, title="Team")
+        >>> chat.add_message("Hello!", 1700000000000, alice)  # alice is built once
+    """
+
+    def __init__(
+        self,
+        user: Person,
+        title: str = None,
+        group: bool = False,
+        max_messages: int = MAXIMUM_RETAINED_MESSAGES,
+        max_bytes: int = 32 * 1024,
+        _persons: _PersonCache = None,
+    ):
+        self.max_messages = min(max_messages, MAXIMUM_RETAINED_MESSAGES)
+        self.max_bytes = max_bytes
+        self._persons = _persons or _PersonCache()
+        self._lock = RLock()
+        self._messages = deque()
+        self._bytes = 0
+        self.style = NotificationCompatMessagingStyle(self._persons.get(user))
+        if title is not None:
+            self.style.setConversationTitle(title)
+        if group or title is not None:
+            self.style.setGroupConversation(True)
+
+    @property
+    def messages(self) -> tuple:
+        return tuple(self._messages)
+
+    @property
+    def size(self) -> int:
+        """Total UTF-8 size of the kept message texts, in bytes."""
+        return self._bytes
+
+    @notification_profiler.setter
+    def add_message(self, text: str, timestamp: int, sender: Person = None):
+        """Append a message; ``sender`` None means the device user.
+
+        Returns:
+            Conversation: This Conversation instance for method chaining.
+        """
+        message = ConversationMessage(
+            text, timestamp, sender, len(text.encode("utf-8"))
+        )
+        with self._lock:
+            self.style.addMessage(text, timestamp, self._persons.get(sender))
+            self._messages.append(message)
+            self._bytes += message.size
+            self._trim()
+        return self
+
+    def _trim(self):
+        java_messages = None
+        while len(self._messages) > 1 and (
+            len(self._messages) > self.max_messages or self._bytes > self.max_bytes
+        ):
+            self._bytes -= self._messages.popleft().size
+            if java_messages is None:
+                java_messages = self.style.getMessages()
+            # the style may already have dropped it past its own limit
+            if java_messages.size() > len(self._messages):
+                java_messages.remove(0)
+
+    def clear(self):
+        """Drop the whole history, e.g. once the conversation has been read."""
+        with self._lock:
+            self._messages.clear()
+            self._bytes = 0
+            self.style.getMessages().clear()
+
+    def get_style(self):
+        return self.style
+
+
+class ConversationStore:
+    """
+    Per-conversation histories and notifications for a messaging app.
+
+    Each conversation gets its own :class:`Conversation`, a reused
+    notification builder and a stable notification ID. Participants are
+    shared across conversations, so a ``Person`` is built once per store.
+
+    Args:
+        user (Person): The device user.
+        channel_id (str): Channel the conversation notifications are posted to.
+        small_icon (int): Drawable resource ID of the notifications' small icon.
+        max_conversations (int): Conversations kept in memory. The least
+            recently updated ones are dropped first, without cancelling their
+            notification. A dropped conversation keeps its notification ID and
+            starts a new history on its next message.
+        first_id (int): Notification ID of the first conversation. The next
+            ones get consecutive IDs.
+        manager (NotificationManagerCompat, optional): Manager used to post.
+        **conversation_options: Passed to every :class:`Conversation`
+            (``max_messages``, ``max_bytes``).
+
+    Example:
+        >>> store = ConversationStore(me, "messages", get_resource_identifier("ic_chat", "drawable"))
+        >>> store.post("team", "Lunch?", timestamp, alice, title="Team")
+    """
+
+    def __init__(
+        self,
+        user: Person,
+        channel_id: str,
+        small_icon: int,
+        max_conversations: int = 50,
+        first_id: int = 1000,
+        manager: NotificationManagerCompat = None,
+        **conversation_options,
+    ):
+        self.user = user
+        self.channel_id = channel_id
+        self.small_icon = small_icon
+        self.max_conversations = max_conversations
+        self.manager = manager or NotificationManagerCompat()
+        self.conversation_options = conversation_options
+        self._persons = _PersonCache()
+        self._lock = RLock()
+        self._conversations = OrderedDict()
+        # kept past eviction, so a conversation always reuses its notification
+        self._ids = {}
+        self._next_id = first_id
+
+    def conversation(self, key, title: str = None) -> Conversation:
+        """Return the conversation for ``key``, creating it if needed."""
+        with self._lock:
+            return self._entry(key, title)[0]
+
+    def _entry(self, key, title):
+        entry = self._conversations.get(key)
+        if entry is not None:
+            self._conversations.move_to_end(key)
+            return entry
+        conversation = Conversation(
+            self.user, title, _persons=self._persons, **self.conversation_options
+        )
+        notification = (
+            Notification(self.channel_id)
+            .set_small_icon(self.small_icon)
+            .set_auto_cancel(True)
+            .set_style(conversation)
+        )
+        notification_id = self._ids.get(key)
+        if notification_id is None:
+            notification_id = self._ids[key] = self._next_id
+            self._next_id += 1
+        entry = self._conversations[key] = (conversation, notification, notification_id)
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+        return entry
+
+    def post(self, key, text: str, timestamp: int, sender: Person = None, title: str = None):
+        """
+        Append a message to a conversation and post its notification.
+
+        Returns:
+            int: The notification ID of the conversation.
+        """
+        with self._lock:
+            conversation, notification, notification_id = self._entry(key, title)
+            conversation.add_message(text, timestamp, sender)
+            self.manager.notify(notification_id, notification)
+        return notification_id
+
+    def remove(self, key):
+        """Forget a conversation and cancel its notification."""
+        with self._lock:
+            self._conversations.pop(key, None)
+            notification_id = self._ids.pop(key, None)
+        if notification_id is not None:
+            self.manager.cancel(notification_id)
+
+    def forget_person(self, person: Person):
+        """Drop the cached Android ``Person`` built for ``person``, e.g. after an avatar change."""
+        self._persons.forget(person)
@@ -0,0 +1,188 @@
+"""
+Grouped notification bundles.
+
+``NotificationGroup`` posts bursts of notifications the way Android expects:
+children share a group key, a single InboxStyle summary lists the latest
+entries, and only the summary alerts. Posts are rate limited, so a burst of
+50 messages becomes a handful of notify() calls instead of 50, and children
+past a cap are removed from the shade and kept only as summary lines.
+"""
+
+__all__ = ("NotificationGroup",)
+
+from collections import OrderedDict
+
+from kvdroid.tools.notification.constants import GroupAlert
+from kvdroid.tools.notification.notification import (
+    Notification,
+    NotificationManagerCompat,
+)
+from kvdroid.tools.notification.styles import InboxStyle
+from kvdroid.tools.notification.utils import RateLimiter
+
+
+class NotificationGroup:
+    """
+    A bundle of notifications posted under one group key with a managed summary.
+
+    Args:
+        channel_id (str): Channel of the summary notification.
+        group_key (str): Group key shared by the summary and its children.
+        summary_id (int): Notification ID of the summary.
+        small_icon (int): Drawable resource ID of the summary's small icon.
+        title (str, optional): Summary title. ``{count}`` is replaced by the
+            number of entries, e.g. ``"{count} new messages"``.
+        max_active (int): Maximum number of children kept in the shade. Older
+            children are cancelled and only remain as summary lines.
+        max_lines (int): Number of lines shown in the summary's InboxStyle.
+        alert (GroupAlert): Group alert behavior applied to the summary and
+            every child. With ``GroupAlert.SUMMARY`` only the summary's first
+            post alerts; later updates are silent until :meth:`clear`.
+        min_interval (float): Minimum delay between two posts, in seconds.
+        manager (NotificationManagerCompat, optional): Manager used to post.
+
+    Example:
+        >>> group = NotificationGroup(
+        ...     "messages", "chat", summary_id=0,
+        ...     small_icon=get_resource_identifier("ic_chat", "drawable"),
+        ...     title="{count} new messages",
+        ... )
+        >>> group.add_all(
+        ...     (message.id, Notification("messages").set_content_text(message.text), message.text)
+        ...     for message in burst
+        ... )
+    """
+
+    def __init__(
+        self,
+        channel_id: str,
+        group_key: str,
+        summary_id: int,
+        small_icon: int,
+        title: str = None,
+        max_active: int = 8,
+        max_lines: int = 6,
+        alert: GroupAlert = GroupAlert.SUMMARY,
+        min_interval: float = 0.2,
+        manager: NotificationManagerCompat = None,
+    ):
+        self.group_key = group_key
+        self.summary_id = summary_id
+        self.title = title
+        self.max_active = max_active
+        self.alert = alert
+        self.manager = manager or NotificationManagerCompat()
+        self.summary = (
+            Notification(channel_id)
+            .set_small_icon(small_icon)
+            .set_group(group_key)
+            .set_group_summary(True)
+            .set_group_alert_behavior(alert)
+            # every flush re-posts the summary; only its first post alerts
+            .set_only_alert_once(True)
+        )
+        self.count = 0
+        self._entries = set()
+        self._limiter = RateLimiter(self._flush, min_interval)
+        self._queued = OrderedDict()
+        self._active = OrderedDict()
+        self.max_lines = max_lines
+        # id -> summary line, oldest first
+        self._lines = OrderedDict()
+
+    @property
+    def active_ids(self) -> tuple:
+        """IDs of the children currently in the notification shade."""
+        return tuple(self._active)
+
+    def add(self, id: int, notification: Notification, line: str = None):
+        """
+        Queue a child notification and schedule a post.
+
+        Args:
+            id (int): Notification ID of the child. Adding the same ID again
+                updates that entry: it replaces the queued or posted
+                notification and its line, and is not counted twice.
+            notification (Notification): The child, not yet built.
+            line (str, optional): Text shown for this entry in the summary.
+
+        Returns:
+            NotificationGroup: Returns self for method chaining.
+        """
+        self.add_all(((id, notification, line),))
+        return self
+
+    def add_all(self, entries):
+        """
+        Queue many children at once; they are posted together with one summary.
+
+        Args:
+            entries: Iterable of ``(id, notification)`` or
+                ``(id, notification, line)`` tuples.
+
+        Returns:
+            NotificationGroup: Returns self for method chaining.
+        """
+        with self._limiter.lock:
+            for id, notification, *line in entries:
+                self._queued.pop(id, None)
+                self._queued[id] = notification
+                if id not in self._entries:
+                    self._entries.add(id)
+                    self.count += 1
+                if line and line[0]:
+                    self._lines.pop(id, None)
+                    self._lines[id] = line[0]
+                    while len(self._lines) > self.max_lines:
+                        self._lines.popitem(last=False)
+        self._limiter.submit()
+        return self
+
+    def flush(self):
+        """Post queued children and the summary now, ignoring the rate limit."""
+        self._limiter.submit(force=True)
+
+    def clear(self):
+        """Cancel every child and the summary, and reset the entry count."""
+        with self._limiter.lock:
+            self._limiter.cancel()
+            for id in self._active:
+                self.manager.cancel(id)
+            self.manager.cancel(self.summary_id)
+            self._queued.clear()
+            self._active.clear()
+            self._lines.clear()
+            self._entries.clear()
+            self.count = 0
+
+    def _flush(self):
+        if not self._queued:
+            return
+        children = []
+        for id, notification in self._queued.items():
+            notification.set_group(self.group_key).set_group_alert_behavior(self.alert)
+            children.append((id, notification))
+            self._active.pop(id, None)
+            self._active[id] = True
+        self._queued.clear()
+
+        # collapse the oldest children into the summary
+        while len(self._active) > self.max_active:
+            oldest, _ = self._active.popitem(last=False)
+            self.manager.cancel(oldest)
+        children = [(id, n) for id, n in children if id in self._active]
+
+        self.manager.notify_all(children + [(self.summary_id, self._build_summary())])
+
+    def _build_summary(self):
+        title = self.title.format(count=self.count) if self.title else None
+        style = InboxStyle()
+        for line in self._lines.values():
+            style.add_line(line)
+        hidden = self.count - len(self._lines)
+        if hidden > 0:
+            style.set_summary_text(f"+{hidden} more")
+        if title:
+            style.set_big_content_title(title)
+            self.summary.set_content_title(title)
+        return self.summary.set_number(self.count).set_style(style)
@@ -65,7 +65,8 @@ __all__ = (
     "NotificationChannel",
 )
 
-from typing import Union
+from time import perf_counter
+from typing import Iterable, Union
 
 from android import python_act  # NOQA
 
@@ -82,11 +83,14 @@ from kvdroid.jclass.androidx import (
     NotificationManagerCompat as _NotificationManagerCompat,
     RemoteInput,
 )
-from kvdroid.tools.graphics import get_bitmap
+from kvdroid.jclass.java import ArrayList
+from kvdroid.tools.notification.assets import notification_assets, LARGE_ICON
 from kvdroid.tools.notification.base import Builder, Person
+from kvdroid.tools.notification.profiler import notification_profiler, profile_setters
 from kvdroid.tools.notification.constants import (
     Default,
     Foreground,
+    GroupAlert,
     Priority,
     Importance,
 )
@@ -95,6 +99,7 @@ from kvdroid.tools.notification.utils import Intent
 from kvdroid.tools.vibration import VibrationEffect
 
 
+@profile_setters
 class Notification(Builder):
     """
     A builder class for creating Android notifications with method chaining.
@@ -413,6 +418,27 @@ class Notification(Builder):
         self.builder.setGroup(group_key)
         return self
 
+    def set_group_alert_behavior(self, behavior: GroupAlert):
+        """
+        Choose which notifications of a group may make noise or vibrate.
+
+        With ``GroupAlert.SUMMARY``, children posted to the group are silent and
+        only the summary alerts, so a burst of notifications alerts once.
+
+        Args:
+            behavior (GroupAlert): ``GroupAlert.ALL``, ``GroupAlert.SUMMARY`` or
+                ``GroupAlert.CHILDREN``.
+
+        Returns:
+            Notification: Returns self for method chaining.
+
+        Example:
+            >>> from kvdroid.tools.notification.constants import GroupAlert
+            >>> notification.set_group("messages").set_group_alert_behavior(GroupAlert.SUMMARY)
+        """
+        self.builder.setGroupAlertBehavior(behavior.value)
+        return self
+
     def set_group_summary(self, is_group_summary: bool):
         """
         Set whether this notification is the summary for a group.
@@ -453,7 +479,7 @@ class Notification(Builder):
             >>> # or
             >>> notification.set_large_icon(get_resource_identifier("avatar", "drawable"))
         """
-        bitmap = get_bitmap(large_icon)
+        bitmap = notification_assets.get(large_icon, LARGE_ICON)
         self.builder.setLargeIcon(bitmap)
         return self
 
@@ -775,6 +801,8 @@ class Notification(Builder):
             >>> notification.set_style(big_picture_style)
         """
         self.builder.setStyle(style.get_style())
+        if notification_profiler.enabled:
+            notification_profiler.link(style, self)
         return self
 
     def set_sub_text(self, sub_text: str):
@@ -1144,17 +1172,24 @@ class NotificationManagerCompat:
     manage notifications and notification channels across different Android versions.
     """
 
+    # one Java manager for the process, bound to the application context so
+    # short-lived activities and services are never kept alive by it
+    _manager = None
+
     def __init__(self, context=None):
         """
         Initialize the notification manager.
 
         Args:
             context (Context, optional): The Android context to use. Defaults to the current activity.
+                Only its application context is kept.
         """
         self.context = context or activity
-        self.__notification_manager = getattr(_NotificationManagerCompat(), "from")(
-            self.context
-        )
+        if NotificationManagerCompat._manager is None:
+            NotificationManagerCompat._manager = getattr(_NotificationManagerCompat(), "from")(
+                self.context.getApplicationContext()
+            )
+        self.__notification_manager = NotificationManagerCompat._manager
 
     def notify(self, id: int, notification: Union[Notification, object]):
         """
@@ -1164,9 +1199,41 @@ class NotificationManagerCompat:
             id (int): A unique identifier for this notification.
             notification (Notification): The Notification object to display, or a built Android Notification object.
         """
+        owner = None
         if hasattr(notification, "build"):
-            notification = notification.build()
-        self.__notification_manager.notify(id, notification)
+            owner = notification
+            with notification_profiler.measure("java_build", owner):
+                notification = notification.build()
+        with notification_profiler.measure("post", owner):
+            self.__notification_manager.notify(id, notification)
+        if notification_profiler.enabled:
+            notification_profiler.record_post(id, owner)
+
+    def notify_all(self, notifications: Iterable[tuple[int, Union[Notification, object]]]):
+        """
+        Post several notifications in one pass.
+
+        Every notification is built first, so a failing builder posts nothing.
+
+        Args:
+            notifications: ``(id, notification)`` pairs, where notification is a
+                Notification object or a built Android Notification object.
+        """
+        built = []
+        for id, notification in notifications:
+            owner = None
+            start = perf_counter()
+            if hasattr(notification, "build"):
+                owner = notification
+                notification = notification.build()
+            built.append((id, notification, owner, perf_counter() - start))
+        for id, notification, owner, build_time in built:
+            if notification_profiler.enabled:
+                notification_profiler.add("java_build", build_time, owner)
+            with notification_profiler.measure("post", owner):
+                self.__notification_manager.notify(id, notification)
+            if notification_profiler.enabled:
+                notification_profiler.record_post(id, owner)
 
     def cancel(self, id: int):
         """
@@ -1192,6 +1259,36 @@ class NotificationManagerCompat:
         """
         self.__notification_manager.createNotificationChannel(channel.channel)
 
+    @require_api(">=", 26)
+    def create_notification_channels(self, channels: Iterable[NotificationChannel]):
+        """
+        Create or update several notification channels with a single call.
+
+        Args:
+            channels (Iterable[NotificationChannel]): The channels to create.
+        """
+        channel_list = ArrayList(instantiate=True)
+        for channel in channels:
+            channel_list.add(channel.channel)
+        self.__notification_manager.createNotificationChannels(channel_list)
+
+    @require_api(">=", 26)
+    def get_notification_channels(self) -> list:
+        """
+        Return the app's existing channels as Android ``NotificationChannel`` objects.
+        """
+        return list(self.__notification_manager.getNotificationChannels().toArray())
+
+    @require_api(">=", 26)
+    def delete_notification_channel(self, channel_id: str):
+        """
+        Delete a notification channel.
+
+        Args:
+            channel_id (str): ID of the channel to delete.
+        """
+        self.__notification_manager.deleteNotificationChannel(channel_id)
+
 
 def get_notification_reply_text(intent, key_text_reply):
     """
@@ -0,0 +1,280 @@
+"""
+Notification posting profiler.
+
+``notification_profiler`` times every ``NotificationManagerCompat.notify()`` in
+four stages:
+
+    - ``python_build``: time spent in the ``Notification`` setters, bitmap
+      decoding excluded
+    - ``bitmap_decode``: time spent decoding icons and pictures
+    - ``java_build``: ``NotificationCompat.Builder.build()``
+    - ``post``: the ``notify()`` call itself, i.e. the IPC to system_server
+
+Setter and decode time is accumulated on the ``Notification`` (or style) it
+was spent on, and collected when that notification is posted, whichever
+thread posts it. This keeps timings right for notifications posted later from
+a timer thread, like rate-limited progress updates. Time spent outside any
+notification object is kept per thread and attributed to the next post from
+that thread. Profiling is off by default and costs a single attribute check
+per call while off.
+
+Example:
+    >>> from kvdroid.tools.notification.profiler import notification_profiler
+    >>> notification_profiler.enable(sink="kvdroid.notification")  # log each post
+    >>> manager.notify(1, notification)
+    >>> notification_profiler.stats()["post"]["p95_ms"]
+"""
+
+__all__ = ("NotificationProfiler", "notification_profiler", "STAGES")
+
+import functools
+import logging
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock, local
+from time import perf_counter
+from weakref import WeakKeyDictionary
+
+STAGES = ("python_build", "bitmap_decode", "java_build", "post")
+
+# histogram bucket upper bounds, in milliseconds; the last bucket is unbounded
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _StageStats:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+
+    def percentile(self, fraction):
+        # upper bound of the bucket holding the given fraction of samples
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return self.max * 1000
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "histogram": dict(zip(BUCKETS_MS + (float("inf"),), self.buckets)),
+        }
+
+
+class NotificationProfiler:
+    """
+    Collects per-stage timings of notification posts.
+
+    Counters and histograms are kept in memory and read with :meth:`stats`.
+    A sink, either a logger name, a ``logging.Logger`` or a callable taking
+    ``(notification_id, timings)``, can be attached to see every post as it
+    happens.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._sink = None
+        self._lock = Lock()
+        self._local = local()
+        self._stages = {stage: _StageStats() for stage in STAGES}
+        # pending timings per notification object, and the notification each
+        # style is set on; weak so unposted builders are not kept alive
+        self._owned = WeakKeyDictionary()
+        self._links = WeakKeyDictionary()
+        self.posts = 0
+
+    def enable(self, sink=None):
+        """Start profiling, optionally reporting every post to ``sink``."""
+        if isinstance(sink, str):
+            sink = logging.getLogger(sink)
+        self._sink = sink
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self._sink = None
+
+    def reset(self):
+        with self._lock:
+            self._stages = {stage: _StageStats() for stage in STAGES}
+            self._owned.clear()
+            self.posts = 0
+
+    def stats(self) -> dict:
+        """Counters and histograms per stage, times in milliseconds."""
+        with self._lock:
+            stats = {stage: value.as_dict() for stage, value in self._stages.items()}
+            stats["posts"] = self.posts
+        return stats
+
+    def _owners(self):
+        owners = getattr(self._local, "owners", None)
+        if owners is None:
+            owners = self._local.owners = []
+        return owners
+
+    def _thread_pending(self):
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            pending = self._local.pending = dict.fromkeys(STAGES, 0.0)
+        return pending
+
+    def add(self, stage: str, seconds: float, owner=None):
+        """
+        Attribute ``seconds`` of ``stage`` to ``owner``, or to the object whose
+        setter is running, or else to the next post from this thread.
+        """
+        if owner is None:
+            owners = self._owners()
+            owner = owners[-1] if owners else None
+        if owner is None:
+            self._thread_pending()[stage] += seconds
+            return
+        with self._lock:
+            owner = self._links.get(owner, owner)
+            pending = self._owned.get(owner)
+            if pending is None:
+                pending = self._owned[owner] = dict.fromkeys(STAGES, 0.0)
+            pending[stage] += seconds
+
+    def link(self, style, notification):
+        """Count time spent on ``style`` (e.g. a Conversation) as ``notification``'s."""
+        with self._lock:
+            self._links[style] = notification
+            pending = self._owned.pop(style, None)
+        if pending:
+            for stage, seconds in pending.items():
+                self.add(stage, seconds, notification)
+
+    def release(self, owner):
+        """
+        Move ``owner``'s pending timings to this thread, for when it is posted
+        as an already built Android notification.
+        """
+        with self._lock:
+            pending = self._owned.pop(owner, None)
+        if pending:
+            thread_pending = self._thread_pending()
+            for stage, seconds in pending.items():
+                thread_pending[stage] += seconds
+
+    @contextmanager
+    def measure(self, stage: str, owner=None):
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, perf_counter() - start, owner)
+
+    def setter(self, method):
+        """Decorator timing a builder setter as ``python_build``, minus decode time."""
+
+        @functools.wraps(method)
+        def wrapper(owner, *args, **kwargs):
+            if not self.enabled:
+                return method(owner, *args, **kwargs)
+            owners = self._owners()
+            if owners:
+                # nested setter, the outer one times it
+                return method(owner, *args, **kwargs)
+            owners.append(owner)
+            decode = self._decode_time(owner)
+            start = perf_counter()
+            try:
+                return method(owner, *args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                owners.pop()
+                self.add("python_build", elapsed - (self._decode_time(owner) - decode), owner)
+
+        wrapper.profiled = True
+        return wrapper
+
+    def _decode_time(self, owner):
+        with self._lock:
+            pending = self._owned.get(self._links.get(owner, owner))
+            return pending["bitmap_decode"] if pending else 0.0
+
+    def record_post(self, notification_id, owner=None):
+        """Close the timings of ``owner`` and of the current thread as one post."""
+        timings = self._local.__dict__.pop("pending", None)
+        if owner is not None:
+            with self._lock:
+                owned = self._owned.pop(owner, None)
+            if owned is not None:
+                if timings is None:
+                    timings = owned
+                else:
+                    for stage, seconds in owned.items():
+                        timings[stage] += seconds
+        if timings is None:
+            return
+        with self._lock:
+            self.posts += 1
+            for stage, seconds in timings.items():
+                self._stages[stage].add(seconds)
+        sink = self._sink
+        if sink is None:
+            return
+        try:
+            if isinstance(sink, logging.Logger):
+                sink.info(
+                    "notification %s: %s",
+                    notification_id,
+                    ", ".join(f"{k}={v * 1000:.2f}ms" for k, v in timings.items()),
+                )
+            else:
+                sink(notification_id, timings)
+        except Exception:
+            logging.getLogger(__name__).exception("Notification profiler sink failed")
+
+
+notification_profiler = NotificationProfiler()
+
+
+def _wrap_setters(cls):
+    for name, method in list(vars(cls).items()):
+        if (
+            callable(method)
+            and name.startswith(("set_", "add_"))
+            and not getattr(method, "profiled", False)
+        ):
+            setattr(cls, name, notification_profiler.setter(method))
+
+
+def profile_setters(cls):
+    """Class decorator wrapping every public ``set_*``/``add_*`` method with :meth:`NotificationProfiler.setter`.
+
+    Subclasses are wrapped too when they are defined, so overridden setters
+    are timed as well.
+    """
+    _wrap_setters(cls)
+
+    def __init_subclass__(subclass, **kwargs):
+        super(cls, subclass).__init_subclass__(**kwargs)
+        _wrap_setters(subclass)
+
+    cls.__init_subclass__ = classmethod(__init_subclass__)
+    return cls
@@ -0,0 +1,190 @@
+"""
+Updatable progress notifications.
+
+``ProgressNotification`` keeps a single ``NotificationCompat.Builder`` alive for
+the whole lifetime of a task. Each update only calls the setters whose value
+changed, and ``notify()`` is rate limited to what the system accepts (about 5
+updates per second), with the latest value always posted at the end of the
+interval. Posting a new builder for every progress tick makes Android drop
+updates and, for large icons, re-decodes the bitmap every time.
+"""
+
+__all__ = ("ProgressNotification",)
+
+from kvdroid.tools.notification.assets import notification_assets, LARGE_ICON
+from kvdroid.tools.notification.notification import (
+    Notification,
+    NotificationManagerCompat,
+)
+from kvdroid.tools.notification.profiler import notification_profiler
+from kvdroid.tools.notification.utils import RateLimiter
+
+_MISSING = object()
+
+
+class ProgressNotification(Notification):
+    """
+    A :class:`Notification` that is posted and then updated in place.
+
+    All the regular ``set_*`` methods can be used to configure the
+    notification before the first :meth:`update`. Alerts are limited to the
+    first post (``setOnlyAlertOnce``), so updates never buzz or ring again.
+
+    Args:
+        channel_id (str): The notification channel ID.
+        id (int): Notification ID used for every post of this notification.
+        manager (NotificationManagerCompat, optional): Manager used to post.
+            A new one is created for the current activity if omitted.
+        min_interval (float): Minimum delay between two posts, in seconds.
+
+    Example:
+        >>> download = (
+        ...     ProgressNotification("downloads", 10)
+        ...     .set_small_icon(get_resource_identifier("ic_download", "drawable"))
+        ...     .set_content_title("video.mp4")
+        ...     .set_ongoing(True)
+        ... )
+        >>> for done in range(0, total, chunk):
+        ...     download.update(done, total, text=f"{done * 100 // total}%")
+        >>> download.finish(text="Download complete")
+    """
+
+    __slots__ = ("id", "manager", "_limiter", "_fields", "_large_icon_source", "_max")
+
+    def __init__(
+        self,
+        channel_id: str,
+        id: int,
+        manager: NotificationManagerCompat = None,
+        min_interval: float = 0.2,
+    ):
+        super().__init__(channel_id)
+        self.id = id
+        self.manager = manager or NotificationManagerCompat()
+        self._limiter = RateLimiter(self._post, min_interval)
+        self._fields = {}
+        self._large_icon_source = None
+        # kept apart from the progress field, which finish() clears
+        self._max = 100
+        self.builder.setOnlyAlertOnce(True)
+
+    @property
+    def pending(self) -> bool:
+        """True while an update is waiting for the rate limit window to end."""
+        return self._limiter.pending
+
+    def _set(self, name, value, setter):
+        # only cross JNI for values that actually changed
+        if self._fields.get(name, _MISSING) == value:
+            return
+        self._fields[name] = value
+        if isinstance(value, tuple):
+            setter(*value)
+        else:
+            setter(value)
+
+    def set_large_icon(self, large_icon: int | str | object):
+        """
+        Set the large icon, decoding it only when the source changes.
+
+        Args:
+            large_icon (int | str | object): The large icon as a resource ID,
+                file path string, or InputStream.
+
+        Returns:
+            ProgressNotification: Returns self for method chaining.
+        """
+        if isinstance(large_icon, (int, str)) and large_icon == self._large_icon_source:
+            return self
+        with self._limiter.lock:
+            self.builder.setLargeIcon(notification_assets.get(large_icon, LARGE_ICON))
+            self._large_icon_source = large_icon
+        return self
+
+    @notification_profiler.setter
+    def update(
+        self,
+        progress: int = None,
+        max: int = None,
+        indeterminate: bool = False,
+        title: str = None,
+        text: str = None,
+        sub_text: str = None,
+    ):
+        """
+        Change the progress and/or texts and post the notification.
+
+        Arguments left as None keep their current value. The post is skipped
+        if it falls inside the rate limit window; the latest state is then
+        posted when the window ends.
+
+        Args:
+            progress (int, optional): Current progress value.
+            max (int, optional): Maximum progress value. Defaults to the last
+                one given, or 100.
+            indeterminate (bool): Show an indeterminate progress bar.
+            title (str, optional): New content title.
+            text (str, optional): New content text.
+            sub_text (str, optional): New sub text.
+
+        Returns:
+            ProgressNotification: Returns self for method chaining.
+        """
+        with self._limiter.lock:
+            if max is not None:
+                self._max = max
+            if progress is not None or indeterminate:
+                self._set(
+                    "progress",
+                    (self._max, progress or 0, indeterminate),
+                    self.builder.setProgress,
+                )
+            if title is not None:
+                self._set("title", title, self.builder.setContentTitle)
+            if text is not None:
+                self._set("text", text, self.builder.setContentText)
+            if sub_text is not None:
+                self._set("sub_text", sub_text, self.builder.setSubText)
+        self._limiter.submit()
+        return self
+
+    def finish(self, title: str = None, text: str = None, keep_progress: bool = False):
+        """
+        Post the final state and make the notification dismissable.
+
+        The system drops updates posted faster than about 5 per second, except
+        the ones showing a completed progress bar. The completed bar is
+        therefore posted right away, and the bar is removed by a rate limited
+        post afterwards, so the last update is never lost.
+
+        Args:
+            title (str, optional): Final content title.
+            text (str, optional): Final content text.
+            keep_progress (bool): Keep the progress bar instead of removing it.
+                The final state then goes through the rate limit like any
+                update.
+
+        Returns:
+            ProgressNotification: Returns self for method chaining.
+        """
+        with self._limiter.lock:
+            if title is not None:
+                self._set("title", title, self.builder.setContentTitle)
+            if text is not None:
+                self._set("text", text, self.builder.setContentText)
+            self.builder.setOngoing(False)
+            if not keep_progress:
+                self._set("progress", (self._max, self._max, False), self.builder.setProgress)
+                self._post()
+                self._limiter.mark_called()
+                self._set("progress", (0, 0, False), self.builder.setProgress)
+            self._limiter.submit()
+        return self
+
+    def cancel(self):
+        """Remove the notification and drop any pending update."""
+        self._limiter.cancel()
+        self.manager.cancel(self.id)
+
+    def _post(self):
+        self.manager.notify(self.id, self)
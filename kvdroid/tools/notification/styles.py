@@ -58,7 +58,7 @@ from kvdroid.jclass.androidx import (
     NotificationCompatProgressStyle,
 )
 from kvdroid.jclass.java import List
-from kvdroid.tools.graphics import get_bitmap
+from kvdroid.tools.notification.assets import notification_assets, BIG_PICTURE, LARGE_ICON
 from kvdroid.tools.notification.base import Person
 
 
@@ -286,7 +286,7 @@ class BigPictureStyle(Style):
         Returns:
             BigPictureStyle: This BigPictureStyle instance for method chaining.
         """
-        self.style.bigPicture(get_bitmap(big_picture))
+        self.style.bigPicture(notification_assets.get(big_picture, BIG_PICTURE))
         return self
 
     def big_large_icon(self, big_large_icon: int | str | object):
@@ -302,7 +302,7 @@ class BigPictureStyle(Style):
         Returns:
             BigPictureStyle: This BigPictureStyle instance for method chaining.
         """
-        self.style.bigLargeIcon(get_bitmap(big_large_icon))
+        self.style.bigLargeIcon(notification_assets.get(big_large_icon, LARGE_ICON))
         return self
 
     def set_big_content_title(self, big_content_title: str):
@@ -694,7 +694,7 @@ class CallStyle(Style):
         Returns:
             CallStyle: This CallStyle instance for method chaining.
         """
-        bitmap = get_bitmap(verification_icon)
+        bitmap = notification_assets.get(verification_icon, LARGE_ICON)
         icon = Icon().createWithBitmap(bitmap)
         self.style.setVerificationIcon(icon)
         return self
@@ -966,7 +966,7 @@ class ProgressStyle(Style):
         Returns:
             ProgressStyle: This ProgressStyle instance for method chaining.
         """
-        bitmap = get_bitmap(end_icon)
+        bitmap = notification_assets.get(end_icon, LARGE_ICON)
         icon = Icon().createWithBitmap(bitmap)
         self.style.setProgressEndIcon(icon)
         return self
@@ -1026,7 +1026,7 @@ class ProgressStyle(Style):
         Returns:
             ProgressStyle: This ProgressStyle instance for method chaining.
         """
-        bitmap = get_bitmap(start_icon)
+        bitmap = notification_assets.get(start_icon, LARGE_ICON)
         icon = Icon().createWithBitmap(bitmap)
         self.style.setProgressStartIcon(icon)
         return self
@@ -1044,7 +1044,7 @@ class ProgressStyle(Style):
         Returns:
             ProgressStyle: This ProgressStyle instance for method chaining.
         """
-        bitmap = get_bitmap(tracker_icon)
+        bitmap = notification_assets.get(tracker_icon, LARGE_ICON)
         icon = Icon().createWithBitmap(bitmap)
         self.style.setProgressTrackerIcon(icon)
         return self
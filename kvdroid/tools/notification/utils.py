@@ -1,4 +1,7 @@
-__all__ = ("Intent", "PendingIntent")
+__all__ = ("Intent", "PendingIntent", "RateLimiter")
+
+from threading import RLock, Timer
+from time import monotonic
 
 from jnius import JavaException
 from android import python_act  # NOQA
@@ -87,3 +90,76 @@ class PendingIntent:
         return PendingIntentJava().getService(
             context or activity, request_code, intent.get_intent(), flags.value
         )
+
+
+class RateLimiter:
+    """Run ``callback`` at most once per ``min_interval`` seconds, never losing the last call.
+
+    Calls that arrive inside the interval are folded into one trailing call,
+    made from a timer thread when the interval ends, so the latest state is
+    always delivered. Android drops notification updates posted faster than
+    about 5 per second, hence the 0.2s default.
+
+    ``lock`` is held while ``callback`` runs; hold it too while mutating
+    whatever the callback reads.
+    """
+
+    __slots__ = ("callback", "min_interval", "lock", "_last_call", "_timer", "_pending")
+
+    def __init__(self, callback, min_interval: float = 0.2):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.lock = RLock()
+        self._last_call = None
+        self._timer = None
+        self._pending = False
+
+    @property
+    def pending(self) -> bool:
+        return self._pending
+
+    def submit(self, force: bool = False):
+        """Request a call. With ``force`` the callback runs now, ignoring the interval."""
+        with self.lock:
+            now = monotonic()
+            wait = 0.0
+            if self._last_call is not None:
+                wait = self._last_call + self.min_interval - now
+            if force or wait <= 0:
+                self._cancel_timer()
+                self._call(now)
+                return
+            self._pending = True
+            if self._timer is None:
+                self._timer = Timer(wait, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def mark_called(self):
+        """Record a call made outside the limiter, so the next one waits a full interval."""
+        with self.lock:
+            self._cancel_timer()
+            self._pending = False
+            self._last_call = monotonic()
+
+    def cancel(self):
+        """Drop a pending trailing call."""
+        with self.lock:
+            self._cancel_timer()
+            self._pending = False
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush(self):
+        with self.lock:
+            self._timer = None
+            if self._pending:
+                self._call(monotonic())
+
+    def _call(self, now):
+        self._pending = False
+        self._last_call = now
+        self.callback()
@@ -1,15 +1,388 @@
-from kvdroid import activity
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import RLock
+from typing import Iterable, NamedTuple
+
+from jnius import JavaException
+
+from kvdroid import activity, packages, Logger
 from kvdroid.jclass.android import ApplicationInfo, PackageManager, ComponentName, VERSION
 from kvdroid.jclass.java import File
+from kvdroid.tools.graphics import bitmap_to_drawable, get_bitmap, save_drawable
+
+
+class PackageRecord(object):
+    """
+    Plain Python copy of an installed package's ``PackageInfo``.
+
+    Every field is read once when the record is created, so reading them
+    afterward never crosses JNI. ``size`` is read from the file system on
+    demand.
+    """
+
+    __slots__ = (
+        "package_name",
+        "version_name",
+        "version_code",
+        "first_install_time",
+        "last_update_time",
+        "uid",
+        "flags",
+        "enabled",
+        "system",
+        "target_sdk_version",
+        "min_sdk_version",
+        "source_dir",
+        "public_source_dir",
+        "data_dir",
+        "process_name",
+        "shared_library_files",
+        "permissions",
+        "activities",
+        "application_info",
+    )
+
+    def __init__(self, info, system_flags):
+        application = info.applicationInfo
+        self.package_name = info.packageName
+        self.version_name = info.versionName
+        self.version_code = (
+            info.getLongVersionCode() if VERSION().SDK_INT >= 28 else info.versionCode
+        )
+        self.first_install_time = info.firstInstallTime
+        self.last_update_time = info.lastUpdateTime
+        self.uid = application.uid
+        self.flags = application.flags
+        self.enabled = application.enabled
+        self.system = (self.flags & system_flags) != 0
+        self.target_sdk_version = application.targetSdkVersion
+        self.min_sdk_version = application.minSdkVersion
+        self.source_dir = application.sourceDir
+        self.public_source_dir = application.publicSourceDir
+        self.data_dir = application.dataDir
+        self.process_name = application.processName
+        self.shared_library_files = application.sharedLibraryFiles
+        self.permissions = tuple(info.requestedPermissions or ())
+        self.activities = tuple(act.name for act in info.activities or ())
+        # kept for label/icon loading and GET_META_DATA's metaData
+        self.application_info = application
+
+    @property
+    def label(self) -> Future:
+        """Lazy handle on the app label, see :data:`app_resources`."""
+        return app_resources.label(self)
+
+    @property
+    def icon(self) -> Future:
+        """Lazy handle on the app icon ``Drawable``, see :data:`app_resources`."""
+        return app_resources.icon(self)
+
+    @property
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.public_source_dir)
+        except OSError:
+            return File(self.public_source_dir).length()
+
+    def __repr__(self):
+        return f"PackageRecord({self.package_name!r}, {self.version_name!r})"
+
+
+class AppSummary(NamedTuple):
+    package_name: str
+    system: bool
+    enabled: bool
+
+
+class PackageCatalog(object):
+    """
+    Cached snapshot of the installed packages.
+
+    The first read fetches every package with one ``getInstalledPackages``
+    call, using ``GET_PERMISSIONS | GET_ACTIVITIES | GET_META_DATA``, and
+    converts each one to a :class:`PackageRecord`. Later reads are served
+    from memory. ``PACKAGE_ADDED``, ``PACKAGE_REPLACED`` and
+    ``PACKAGE_REMOVED`` broadcasts keep the snapshot current: only the package
+    named in the broadcast is fetched again, and only when it is next read.
+
+    On Android 11+, the packages visible to the app depend on its
+    ``<queries>`` manifest entries or the ``QUERY_ALL_PACKAGES`` permission.
+
+    Example:
+        >>> from kvdroid.tools.package import package_catalog
+        >>> for record in package_catalog:
+        ...     print(record.package_name, record.version_name, record.system)
+        >>> package_catalog["com.android.settings"].permissions
+    """
+
+    def __init__(self, watch: bool = True):
+        self.watch = watch
+        self._lock = RLock()
+        self._records = None
+        self._summaries = None
+        self._stale = set()
+        self._receiver = None
+        self._flags = None
+        self._system_flags = None
+
+    @property
+    def flags(self) -> int:
+        if self._flags is None:
+            self._flags = (
+                PackageManager().GET_PERMISSIONS
+                | PackageManager().GET_ACTIVITIES
+                | PackageManager().GET_META_DATA
+            )
+            self._system_flags = (
+                ApplicationInfo().FLAG_SYSTEM | ApplicationInfo().FLAG_UPDATED_SYSTEM_APP
+            )
+        return self._flags
+
+    def _record(self, info):
+        return PackageRecord(info, self._system_flags)
+
+    @property
+    def loaded(self) -> bool:
+        return self._records is not None
+
+    def record(self, package: str) -> PackageRecord:
+        """
+        Record of one package. Served from the snapshot once it is loaded,
+        otherwise fetched on its own with a single ``getPackageInfo`` call.
+
+        Raises:
+            jnius.JavaException: If the package is not installed.
+        """
+        with self._lock:
+            if self._records is not None:
+                if self._stale:
+                    self._update_stale()
+                record = self._records.get(package)
+                if record is not None:
+                    return record
+        flags = self.flags
+        return self._record(activity.getPackageManager().getPackageInfo(package, flags))
+
+    def summaries(self) -> dict:
+        """
+        Name, system flag and enabled state of every installed package.
+
+        Served from the full snapshot when it is loaded. Otherwise it is
+        fetched with one ``getInstalledApplications(0)`` call, a much lighter
+        query than :meth:`records`, and cached until the next package
+        broadcast.
+        """
+        with self._lock:
+            if self._records is not None:
+                return {
+                    name: AppSummary(name, record.system, record.enabled)
+                    for name, record in self.records().items()
+                }
+            if self._summaries is None:
+                self.flags  # resolves the system flags too
+                applications = activity.getPackageManager().getInstalledApplications(0)
+                self._summaries = {
+                    info.packageName: AppSummary(
+                        info.packageName,
+                        (info.flags & self._system_flags) != 0,
+                        info.enabled,
+                    )
+                    for info in applications.toArray()
+                }
+                if self.watch:
+                    self._start_watching()
+            return self._summaries
+
+    def records(self) -> dict:
+        """All packages, as a dict of package name to :class:`PackageRecord`."""
+        with self._lock:
+            if self._records is None:
+                self.refresh()
+            elif self._stale:
+                self._update_stale()
+            return self._records
+
+    def refresh(self):
+        """Drop the snapshot and fetch every package again."""
+        with self._lock:
+            flags = self.flags
+            installed = activity.getPackageManager().getInstalledPackages(flags)
+            self._records = {
+                record.package_name: record
+                for record in map(self._record, installed.toArray())
+            }
+            self._stale.clear()
+            if self.watch:
+                self._start_watching()
+
+    def invalidate(self, package: str = None):
+        """Mark ``package``, or the whole snapshot, as out of date."""
+        with self._lock:
+            self._summaries = None
+            if package is None:
+                self._records = None
+                self._stale.clear()
+            else:
+                self._stale.add(package)
+
+    def _update_stale(self):
+        manager = activity.getPackageManager()
+        for package in self._stale:
+            try:
+                self._records[package] = self._record(
+                    manager.getPackageInfo(package, self.flags)
+                )
+            except JavaException:
+                self._records.pop(package, None)
+        self._stale.clear()
+
+    def _start_watching(self):
+        if self._receiver is not None:
+            return
+        from kvdroid.tools.broadcast import BroadcastReceiver
+
+        self._receiver = BroadcastReceiver(
+            self._on_package_changed,
+            actions=["PACKAGE_ADDED", "PACKAGE_REPLACED", "PACKAGE_REMOVED"],
+            data_schemes=["package"],
+        )
+        self._receiver.start()
+
+    def stop_watching(self):
+        if self._receiver is not None:
+            self._receiver.stop()
+            self._receiver = None
+
+    def _on_package_changed(self, _context, intent):
+        data = intent.getData()
+        if data is None:
+            self.invalidate()
+        else:
+            self.invalidate(data.getSchemeSpecificPart())
+
+    def get(self, package: str, default=None) -> PackageRecord:
+        return self.records().get(package, default)
+
+    def __getitem__(self, package: str) -> PackageRecord:
+        return self.records()[package]
+
+    def __contains__(self, package: str) -> bool:
+        return package in self.records()
+
+    def __iter__(self):
+        return iter(tuple(self.records().values()))
+
+    def __len__(self):
+        return len(self.records())
+
+
+package_catalog = PackageCatalog()
+
+
+class AppResourceLoader(object):
+    """
+    Loads app labels and icons on a thread pool and caches them.
+
+    ``label()`` and ``icon()`` return immediately with a
+    ``concurrent.futures.Future``. Call ``result()`` on it to wait for the
+    value, or ``add_done_callback()`` to be told when it is ready; callbacks
+    run on a worker thread. Results are cached in an LRU keyed by
+    ``(package, versionCode)``, so an app update loads fresh resources.
+
+    With ``cache_dir``, icons are also written there as PNG files with
+    :func:`kvdroid.tools.graphics.save_drawable`. Later loads decode the PNG
+    instead of loading resources from the other app's APK.
+
+    Example:
+        >>> from kvdroid.tools.package import package_catalog
+        >>> for record in package_catalog:
+        ...     tile = make_tile(record.label.result())  # labels are quick
+        ...     record.icon.add_done_callback(lambda f, t=tile: t.set_icon(f.result()))
+    """
+
+    def __init__(self, max_workers: int = 4, max_entries: int = 512, cache_dir: str = None):
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._lock = RLock()
+        self._entries = OrderedDict()
+        self._executor = None
+
+    def load(self, key, loader) -> Future:
+        """Return the cached future for ``key``, or run ``loader()`` on the pool."""
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                self._entries.move_to_end(key)
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="kvdroid-app-resources"
+                )
+            future = self._entries[key] = self._executor.submit(loader)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.add_done_callback(lambda done: self._forget_failed(key, done))
+        return future
+
+    def _forget_failed(self, key, future):
+        # a failed load is retried by the next call instead of being replayed
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                if self._entries.get(key) is future:
+                    del self._entries[key]
+
+    def label(self, record: PackageRecord) -> Future:
+        application = record.application_info
+        return self.load(
+            (record.package_name, record.version_code, "label"),
+            lambda: application.loadLabel(activity.getPackageManager()).toString(),
+        )
+
+    def icon(self, record: PackageRecord) -> Future:
+        return self.load(
+            (record.package_name, record.version_code, "icon"),
+            lambda: self._load_icon(record),
+        )
+
+    def _load_icon(self, record):
+        if self.cache_dir is None:
+            return record.application_info.loadIcon(activity.getPackageManager())
+        name = f"{record.package_name}-{record.version_code}"
+        path = os.path.join(self.cache_dir, name + ".png")
+        if os.path.exists(path):
+            bitmap = get_bitmap(path)
+            if bitmap is not None:
+                return bitmap_to_drawable(bitmap)
+        drawable = record.application_info.loadIcon(activity.getPackageManager())
+        # best effort: vector and layer icons cannot be saved as bitmaps
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            save_drawable(drawable, os.path.join(self.cache_dir, ""), name)
+        except (JavaException, OSError) as e:
+            Logger.debug(f"Kvdroid: could not cache the icon of {record.package_name}: {e}")
+        return drawable
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+app_resources = AppResourceLoader()
 
 
 def all_packages():
-    pkgAppsList = activity.getPackageManager().getInstalledPackages(0)
-    package_list = []
-    for i in range(pkgAppsList.size()):
-        package = pkgAppsList.get(i).applicationInfo
-        package_list.append(package.packageName)
-    return package_list
+    if package_catalog.loaded:
+        return list(package_catalog.records())
+    installed = activity.getPackageManager().getInstalledPackages(0)
+    return [info.packageName for info in installed.toArray()]
 
 
 def all_main_activities():
@@ -44,10 +417,60 @@ def is_package_installed(package):
     try:
         pManager.getApplicationInfo(package, 0)
         return True
-    except:
+    except JavaException:
         return False
 
 
+def are_packages_installed(package_names: Iterable[str]) -> dict:
+    """
+    Check many packages against a single installed-packages snapshot.
+
+    Returns:
+        dict[str, bool]: ``{package_name: installed}``.
+    """
+    installed = package_catalog.summaries()
+    return {package: package in installed for package in package_names}
+
+
+def are_system_packages(package_names: Iterable[str]) -> dict:
+    """
+    Batch :func:`is_system_package`. Packages that are not installed map to False.
+
+    Returns:
+        dict[str, bool]: ``{package_name: is_system}``.
+    """
+    installed = package_catalog.summaries()
+    return {
+        package: package in installed and installed[package].system
+        for package in package_names
+    }
+
+
+def are_packages_enabled(package_names: Iterable[str]) -> dict:
+    """
+    Batch :func:`is_package_enabled`. Packages that are not installed map to False.
+
+    Returns:
+        dict[str, bool]: ``{package_name: enabled}``.
+    """
+    installed = package_catalog.summaries()
+    return {
+        package: package in installed and installed[package].enabled
+        for package in package_names
+    }
+
+
+def installed_share_apps() -> dict:
+    """
+    Which of the apps known to the share helpers (``kvdroid.packages``) are installed.
+
+    Returns:
+        dict[str, bool]: ``{alias: installed}``, e.g. ``{"whatsapp": True, ...}``.
+    """
+    installed = are_packages_installed(packages.values())
+    return {alias: installed[package] for alias, package in packages.items()}
+
+
 def package_source(package):
     installer = activity.getPackageManager().getInstallerPackageName(package)
     if installer == "com.android.vending":
@@ -56,61 +479,38 @@ def package_source(package):
         return "unknown"
 
 
-def package_info(package):
+def package_info(package, lazy=False):
+    """
+    With ``lazy=True``, ``loadLabel``, ``applicationName`` and ``loadIcon``
+    are futures resolved on :data:`app_resources`' thread pool instead of
+    being loaded before returning.
+    """
     pManager = activity.getPackageManager()
-    appInfo = pManager.getPackageInfo(package, 0)
-    installTime = appInfo.firstInstallTime
-    updateTime = appInfo.lastUpdateTime
-    if VERSION().SDK_INT >= 28:
-        versionCode = appInfo.getLongVersionCode()
-    versionName = appInfo.versionName
-    targetSdkVersion = appInfo.applicationInfo.targetSdkVersion
-    minSdkVersion = appInfo.applicationInfo.minSdkVersion
-    enabled = is_package_enabled(package)    
-    application = pManager.getApplicationInfo(
-        package, PackageManager().GET_META_DATA)
-    applicationName=pManager.getApplicationLabel(pManager.getApplicationInfo(package, pManager.GET_META_DATA))
-    size = File(application.publicSourceDir).length()
-    loadLabel = application.loadLabel(pManager)
-    loadIcon = application.loadIcon(pManager)
-    packageName = application.packageName
-    sourceDir = application.sourceDir
-    dataDir = application.dataDir
-    processName = application.processName
-    publicSourceDir = application.publicSourceDir
-    sharedLibraryFiles = application.sharedLibraryFiles
-    packagePerms = pManager.getPackageInfo(
-        packageName, PackageManager().GET_PERMISSIONS)
-    requestedPermissions = packagePerms.requestedPermissions
-    permissions = []
-    if requestedPermissions != None:
-        for i in range(len(requestedPermissions)):
-            permissions.append(requestedPermissions[i])
-    activities = []
-    activity_list = pManager.getPackageInfo(
-        packageName, PackageManager().GET_ACTIVITIES).activities
-    if activity_list:
-        for act in activity_list:
-            activities.append(act.name)
-    infos = {"packageName": packageName,
-             "applicationName":applicationName,
+    record = package_catalog.record(package)
+    application = record.application_info
+    if lazy:
+        loadLabel, loadIcon = record.label, record.icon
+    else:
+        loadLabel, loadIcon = application.loadLabel(pManager), application.loadIcon(pManager)
+    infos = {"packageName": record.package_name,
+             "applicationName": loadLabel,
             "loadLabel": loadLabel,
             "loadIcon": loadIcon,
-            "sourceDir": sourceDir,
-            "dataDir": dataDir,
-            "processName": processName,
-            "publicSourceDir": publicSourceDir,
-            "sharedLibraryFiles": sharedLibraryFiles,
-            "installTime": installTime,
-            "updateTime": updateTime,
-            "versionName": versionName,
-            "versionCode": versionCode,
-            "targetSdkVersion": targetSdkVersion,
-            "minSdkVersion": minSdkVersion,
-            "permissions": permissions,
-            "activities": activities,
-            "enabled": enabled,
-            "size": size
+            "sourceDir": record.source_dir,
+            "dataDir": record.data_dir,
+            "processName": record.process_name,
+            "publicSourceDir": record.public_source_dir,
+            "sharedLibraryFiles": record.shared_library_files,
+            "installTime": record.first_install_time,
+            "updateTime": record.last_update_time,
+            "versionName": record.version_name,
+            "versionCode": record.version_code,
+            "targetSdkVersion": record.target_sdk_version,
+            "minSdkVersion": record.min_sdk_version,
+            "permissions": list(record.permissions),
+            "activities": list(record.activities),
+            "enabled": record.enabled,
+            "size": record.size
             }
     return infos
 
@@ -125,13 +525,32 @@ def is_activity_exported(package, act):
         return False
 
 
-def activity_info(package, act):
+def _version_code(package):
+    if package_catalog.loaded:
+        return package_catalog.record(package).version_code
+    info = activity.getPackageManager().getPackageInfo(package, 0)
+    return info.getLongVersionCode() if VERSION().SDK_INT >= 28 else info.versionCode
+
+
+def activity_info(package, act, lazy=False):
+    """
+    With ``lazy=True``, ``loadLabel`` and ``loadIcon`` are futures resolved
+    on :data:`app_resources`' thread pool.
+    """
     pManager = activity.getPackageManager()
     component = ComponentName(package, act)
     activityInfo = activity.getPackageManager().getActivityInfo(
         component, PackageManager().GET_META_DATA)
-    loadLabel = activityInfo.loadLabel(pManager)
-    loadIcon = activityInfo.loadIcon(pManager)
+    if lazy:
+        # keyed by version like PackageCatalog's, so an app update loads fresh resources
+        version_code = _version_code(package)
+        loadLabel = app_resources.load(
+            (package, version_code, act, "label"), lambda: activityInfo.loadLabel(pManager).toString())
+        loadIcon = app_resources.load(
+            (package, version_code, act, "icon"), lambda: activityInfo.loadIcon(pManager))
+    else:
+        loadLabel = activityInfo.loadLabel(pManager)
+        loadIcon = activityInfo.loadIcon(pManager)
     exported = is_activity_exported(package,act)
     infos = {
         "loadLabel": loadLabel,
@@ -1,61 +1,178 @@
 import os
+from threading import RLock
+
 from jnius import cast
 from kvdroid.jclass.android import Context, VERSION
 from kvdroid.jclass.android.os import Environment
 from kvdroid import activity
 
+# Paths attribute -> Environment.DIRECTORY_* field
+_PUBLIC_DIRECTORIES = {
+    "alarms": "DIRECTORY_ALARMS",
+    "dcim": "DIRECTORY_DCIM",
+    "downloads": "DIRECTORY_DOWNLOADS",
+    "documents": "DIRECTORY_DOCUMENTS",
+    "movies": "DIRECTORY_MOVIES",
+    "music": "DIRECTORY_MUSIC",
+    "notifications": "DIRECTORY_NOTIFICATIONS",
+    "pictures": "DIRECTORY_PICTURES",
+    "podcasts": "DIRECTORY_PODCASTS",
+    "ringtones": "DIRECTORY_RINGTONES",
+}
 
-def sdcard(directory: str = "", slash: bool = False):
-    dirs = {
-        "alarm": Environment().DIRECTORY_ALARMS,
-        "dcim": Environment().DIRECTORY_DCIM,
-        "download": Environment().DIRECTORY_DOWNLOADS,
-        "documents": Environment().DIRECTORY_DOCUMENTS,
-        "movies": Environment().DIRECTORY_MOVIES,
-        "music": Environment().DIRECTORY_MUSIC,
-        "notifications": Environment().DIRECTORY_NOTIFICATIONS,
-        "pictures": Environment().DIRECTORY_PICTURES,
-        "podcasts": Environment().DIRECTORY_PODCASTS,
-        "ringtones": Environment().DIRECTORY_RINGTONES
-    }
-    if not directory:
+# sdcard() directory names that differ from the Paths attribute
+_SDCARD_ALIASES = {"alarm": "alarms", "download": "downloads"}
+
+# app private directories, they never move while the app runs
+_APP_DIRECTORIES = ("files", "cache", "app", "data")
+
+
+class Paths(object):
+    """
+    Storage and app directory paths, looked up once and cached.
+
+    Each attribute is resolved through JNI on first access and then read as a
+    plain Python attribute. Paths on external storage (the sdcard, its public
+    directories, the app's external directories and the removable volumes)
+    are dropped when storage is mounted, unmounted or removed. The next
+    access looks them up again.
+
+    Attributes:
+        sdcard: The primary external storage directory.
+        alarms, dcim, downloads, documents, movies, music, notifications,
+        pictures, podcasts, ringtones: Its public directories.
+        files, cache, app, data: The app's internal directories.
+        ext_files, ext_cache: The app's directories on external storage.
+        storage_volumes: The paths of the removable storage volumes, as a tuple.
+
+    Example:
+        >>> from kvdroid.tools.path import paths
+        >>> for name in os.listdir(paths.downloads):
+        ...     print(os.path.join(paths.downloads, name))
+    """
+
+    def __init__(self, watch: bool = True):
+        self.watch = watch
+        self._lock = RLock()
+        self._receiver = None
+
+    def __getattr__(self, name):
+        # only called on a cache miss, cached values live in the instance dict
+        if name.startswith("_"):
+            raise AttributeError(name)
+        resolver = getattr(type(self), f"_resolve_{name}", None)
+        if resolver is None and name not in _PUBLIC_DIRECTORIES:
+            raise AttributeError(f"Paths has no attribute {name!r}")
+        with self._lock:
+            if name in self.__dict__:
+                return self.__dict__[name]
+            if resolver is None:
+                value = Environment().getExternalStoragePublicDirectory(
+                    getattr(Environment(), _PUBLIC_DIRECTORIES[name])
+                ).getAbsolutePath()
+            else:
+                value = resolver(self)
+            self.__dict__[name] = value
+            if self.watch and name not in _APP_DIRECTORIES:
+                self._start_watching()
+        return value
+
+    def _resolve_sdcard(self):
         return Environment().getExternalStorageDirectory().getAbsolutePath()
-    else:
-        if directory in dirs.keys():
-            return Environment().getExternalStoragePublicDirectory(dirs[directory]).toString() + ("/" if slash else "")
-        else:
-            return None
 
+    def _resolve_files(self):
+        return activity.getFilesDir().getAbsolutePath()
 
-def external_sdcard(slash: bool = False):
-    try:
-        return os.path.join("/storage", os.listdir("/storage")[1]) + ("/" if slash else "")
-    except Exception:
-        return None
+    def _resolve_cache(self):
+        return activity.getCacheDir().getAbsolutePath()
 
+    def _resolve_app(self):
+        return f"{self.files}/app"
 
-def get_storage_volumes():
-    path = []
-    context = activity.getApplicationContext()
-    storage_manager = cast(
-        "android.os.storage.StorageManager",
-        context.getSystemService(Context().STORAGE_SERVICE),
-    )
-
-    if storage_manager is not None:
-        if VERSION().SDK_INT() >= 24:
-            storage_volumes = storage_manager.getStorageVolumes()
-            for storage_volume in storage_volumes:
+    def _resolve_data(self):
+        return activity.getFilesDir().getParent()
+
+    def _resolve_ext_files(self):
+        directory = activity.getExternalFilesDir(None)
+        return directory.getAbsolutePath() if directory is not None else None
+
+    def _resolve_ext_cache(self):
+        directory = activity.getExternalCacheDir()
+        return directory.getAbsolutePath() if directory is not None else None
+
+    def _resolve_storage_volumes(self):
+        path = []
+        storage_manager = cast(
+            "android.os.storage.StorageManager",
+            activity.getApplicationContext().getSystemService(Context().STORAGE_SERVICE),
+        )
+        if storage_manager is None:
+            return ()
+        if VERSION().SDK_INT >= 24:
+            for storage_volume in storage_manager.getStorageVolumes().toArray():
                 if storage_volume.isRemovable():
                     try:
                         directory = storage_volume.getDirectory()
                     except AttributeError:
                         directory = storage_volume.getPathFile()
-                    path.append(directory.getAbsolutePath())
+                    # null while the volume is not mounted
+                    if directory is not None:
+                        path.append(directory.getAbsolutePath())
         else:
-            storage_volumes = storage_manager.getVolumeList()
-            for storage_volume in storage_volumes:
+            for storage_volume in storage_manager.getVolumeList():
                 if storage_volume.isRemovable():
                     path.append(storage_volume.getPath())
+        return tuple(path)
+
+    def invalidate(self, app: bool = False):
+        """Drop the cached external storage paths, and the app's internal ones if ``app``."""
+        with self._lock:
+            for name in list(self.__dict__):
+                if name.startswith("_") or name == "watch":
+                    continue
+                if app or name not in _APP_DIRECTORIES:
+                    del self.__dict__[name]
+
+    def _start_watching(self):
+        if self._receiver is not None:
+            return
+        from kvdroid.tools.broadcast import BroadcastReceiver
+
+        self._receiver = BroadcastReceiver(
+            lambda _context, _intent: self.invalidate(),
+            actions=["MEDIA_MOUNTED", "MEDIA_UNMOUNTED", "MEDIA_REMOVED", "MEDIA_BAD_REMOVAL", "MEDIA_EJECT"],
+            data_schemes=["file"],
+        )
+        self._receiver.start()
+
+    def stop_watching(self):
+        with self._lock:
+            if self._receiver is not None:
+                self._receiver.stop()
+                self._receiver = None
+
+
+paths = Paths()
+
+
+def sdcard(directory: str = "", slash: bool = False):
+    if not directory:
+        return paths.sdcard
+    directory = _SDCARD_ALIASES.get(directory, directory)
+    if directory in _PUBLIC_DIRECTORIES:
+        return getattr(paths, directory) + ("/" if slash else "")
+    return None
 
-    return path if len(path) > 1 else path[0]
+
+def external_sdcard(slash: bool = False):
+    try:
+        return os.path.join("/storage", os.listdir("/storage")[1]) + ("/" if slash else "")
+    except Exception:
+        return None
+
+
+def get_storage_volumes():
+    path = paths.storage_volumes
+    if not path:
+        return None
+    return list(path) if len(path) > 1 else path[0]
@@ -1,10 +1,21 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from random import randint
-from typing import Callable
+from threading import Lock
+from typing import Callable, NamedTuple
 
 from jnius import JavaException
 
-from kvdroid import activity
-from kvdroid.jclass.android import Intent, Activity, VERSION_CODES, VERSION, SdkExtensions
+from kvdroid import activity, Logger
+from kvdroid.jclass.android import (
+    Intent,
+    Activity,
+    VERSION_CODES,
+    VERSION,
+    SdkExtensions,
+    Size,
+    BitmapFactoryOptions,
+    MediaMetadataRetriever,
+)
 from kvdroid.jclass.androidx import (
     PickVisualMedia,
     PickMultipleVisualMedia,
@@ -15,49 +26,105 @@ from kvdroid.jclass.androidx import (
     PickVisualMediaSingleMimeType
 )
 from kvdroid.jclass.android import MediaStore
-from kvdroid.jinterface.activity import ActivityResultCallback
+from kvdroid.jinterface.activity import ActivityResultCallback, ActivityLifecycleCallbacks
 from android.runnable import run_on_ui_thread  # noqa
 from android import activity as act  # noqa
-from kvdroid.tools.uri import resolve_uri
+from kvdroid.tools.content import open_content
+from kvdroid.tools.graphics import BitmapFactory
+from kvdroid.tools.uri import resolve_uris
+from kvdroid.util.image import get_image_size_from_bytes
+
+
+class PickerLaunchers(object):
+    """
+    Photo picker ``ActivityResultLauncher`` instances, registered once and reused.
+
+    A launcher is registered per contract (single or multiple selection)
+    through ``getActivityResultRegistry().register()`` with a fixed key, so it
+    can be registered at any point of the activity lifecycle. Each pick only
+    swaps the Python callback of the launcher. Every launcher is unregistered
+    when the activity is destroyed.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._launchers = {}
+        self._callbacks = {}
+        self._lifecycle_callbacks = None
+
+    def launch(self, multiple: bool, media_type, callback):
+        """Launch the picker for ``media_type``; ``callback`` receives the picked URI(s)."""
+        key = f"kvdroid.photo_picker.{'multiple' if multiple else 'single'}"
+        with self._lock:
+            launcher = self._launcher(key, multiple)
+            self._callbacks[key] = callback
+        builder = PickVisualMediaRequestBuilder(instantiate=True)
+        builder.setMediaType(media_type)
+        launcher.launch(builder.build())
+
+    def _launcher(self, key, multiple):
+        entry = self._launchers.get(key)
+        if entry is None:
+            # the proxy must stay referenced as long as the launcher exists
+            proxy = ActivityResultCallback(lambda result: self._dispatch(key, result))
+            launcher = activity.getActivityResultRegistry().register(
+                key,
+                PickMultipleVisualMedia(instantiate=True) if multiple else PickVisualMedia(instantiate=True),
+                proxy,
+            )
+            entry = self._launchers[key] = (launcher, proxy)
+            self._watch_destroy()
+        return entry[0]
+
+    def _dispatch(self, key, result):
+        with self._lock:
+            callback = self._callbacks.pop(key, None)
+        if callback is not None:
+            callback(result)
+
+    def _watch_destroy(self):
+        if self._lifecycle_callbacks is not None:
+            return
+        self._lifecycle_callbacks = ActivityLifecycleCallbacks(self._on_lifecycle_event)
+        activity.getApplication().registerActivityLifecycleCallbacks(self._lifecycle_callbacks)
+
+    def _on_lifecycle_event(self, event, destroyed_activity):
+        if event == "destroyed" and destroyed_activity.equals(activity):
+            self.unregister_all()
 
+    def unregister_all(self):
+        """Unregister every launcher, e.g. when the activity goes away."""
+        with self._lock:
+            for launcher, _ in self._launchers.values():
+                launcher.unregister()
+            self._launchers.clear()
+            self._callbacks.clear()
+            if self._lifecycle_callbacks is not None:
+                activity.getApplication().unregisterActivityLifecycleCallbacks(self._lifecycle_callbacks)
+                self._lifecycle_callbacks = None
 
-def _register_picker(multiple: bool, callback):
-    return activity.registerForActivityResult(
-        PickMultipleVisualMedia(instantiate=True) if multiple else PickVisualMedia(instantiate=True),
-        ActivityResultCallback(callback)
-    )
+
+picker_launchers = PickerLaunchers()
 
 
 @run_on_ui_thread
 def pick_image_only(multiple: bool, callback):
-    pick_media = _register_picker(multiple, callback)
-    builder = PickVisualMediaRequestBuilder(instantiate=True)
-    builder.setMediaType(PickVisualMediaImageOnly().INSTANCE)
-    pick_media.launch(builder.build())
+    picker_launchers.launch(multiple, PickVisualMediaImageOnly().INSTANCE, callback)
 
 
 @run_on_ui_thread
 def pick_video_only(multiple: bool, callback):
-    pick_media = _register_picker(multiple, callback)
-    builder = PickVisualMediaRequestBuilder(instantiate=True)
-    builder.setMediaType(PickVisualMediaVideoOnly().INSTANCE)
-    pick_media.launch(builder.build())
+    picker_launchers.launch(multiple, PickVisualMediaVideoOnly().INSTANCE, callback)
 
 
 @run_on_ui_thread
 def pick_image_and_video(multiple: bool, callback):
-    pick_media = _register_picker(multiple, callback)
-    builder = PickVisualMediaRequestBuilder(instantiate=True)
-    builder.setMediaType(PickVisualMediaImageAndVideo().INSTANCE)
-    pick_media.launch(builder.build())
+    picker_launchers.launch(multiple, PickVisualMediaImageAndVideo().INSTANCE, callback)
 
 
 @run_on_ui_thread
 def pick_single_mimetype(multiple: bool, mimetype: str, callback):
-    pick_media = _register_picker(multiple, callback)
-    builder = PickVisualMediaRequestBuilder(instantiate=True)
-    builder.setMediaType(PickVisualMediaSingleMimeType(mimetype))
-    pick_media.launch(builder.build())
+    picker_launchers.launch(multiple, PickVisualMediaSingleMimeType(mimetype), callback)
 
 
 @run_on_ui_thread
@@ -66,18 +133,205 @@ def persist_background_permission(uri):
     activity.context.contentResolver.takePersistableUriPermission(uri, flag)
 
 
+class PickedMedia(NamedTuple):
+    """One picked item, as produced by :class:`PickerPipeline`."""
+    index: int
+    uri: object
+    path: str = None
+    width: int = None
+    height: int = None
+    thumbnail: object = None
+
+
+# bytes read to find the image size in the file header
+_HEADER_BYTES = 64 * 1024
+
+
+class PickerPipeline(object):
+    """
+    Processes picker results on a worker pool instead of the UI thread.
+
+    The picked URIs are resolved to paths in one batch with
+    :func:`kvdroid.tools.uri.resolve_uris`, then each item is measured and
+    thumbnailed on request in its own task. ``on_result`` is called with each
+    :class:`PickedMedia` as soon as it is ready, in completion order.
+    ``on_complete`` is called once with all of them, in selection order.
+    Both run on a worker thread, so wrap UI updates in ``Clock.schedule_once``
+    or ``mainthread``.
+
+    Args:
+        max_workers (int): Worker threads, created on first use.
+        with_size (bool): Read the width and height of each item: from the
+            file header with :func:`kvdroid.util.image.get_image_size_from_bytes`,
+            then from ``BitmapFactory`` bounds for other images and from
+            ``MediaMetadataRetriever`` for videos. None when unknown.
+        thumbnail_size (tuple, optional): ``(width, height)`` of an
+            ``android.graphics.Bitmap`` thumbnail to load for each item.
+
+    Example:
+        >>> from kvdroid.tools.photo_picker import PickerPipeline, action_pick_image
+        >>> pipeline = PickerPipeline(with_size=True, thumbnail_size=(256, 256))
+        >>> action_pick_image(
+        ...     on_done, multiple=True, pipeline=pipeline,
+        ...     on_result=lambda item: Clock.schedule_once(lambda dt: gallery.add(item)),
+        ... )
+    """
+
+    def __init__(self, max_workers: int = 4, with_size: bool = False, thumbnail_size: tuple = None):
+        self.max_workers = max_workers
+        self.with_size = with_size
+        self.thumbnail_size = thumbnail_size
+        self._lock = Lock()
+        self._executor = None
+
+    def process(self, uris, on_result: Callable = None, on_complete: Callable = None) -> list:
+        """
+        Submit ``uris`` for processing and return right away.
+
+        Returns:
+            list[concurrent.futures.Future]: One future per URI, resolving to
+            its :class:`PickedMedia`.
+        """
+        uris = list(uris)
+        futures = [Future() for _ in uris]
+        state = {"left": len(futures)}
+        if not futures and on_complete is not None:
+            on_complete([])
+
+        def _done(future):
+            if on_result is not None:
+                try:
+                    on_result(future.result())
+                except Exception as e:
+                    Logger.exception(f"Kvdroid: photo picker result callback failed: {e}")
+            with self._lock:
+                state["left"] -= 1
+                last = not state["left"]
+            if last and on_complete is not None:
+                on_complete([f.result() for f in futures])
+
+        for future in futures:
+            future.add_done_callback(_done)
+        if futures:
+            self._submit(self._resolve_all, uris, futures)
+        return futures
+
+    def _submit(self, function, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="kvdroid-photo-picker"
+                )
+            return self._executor.submit(function, *args)
+
+    def _resolve_all(self, uris, futures):
+        # one batch, so media documents share a single `_id IN (...)` query
+        try:
+            resolved = resolve_uris(uris, self.max_workers)
+        except Exception as e:
+            Logger.debug(f"Kvdroid: could not resolve picked URIs: {e}")
+            resolved = [None] * len(uris)
+        for index, (uri, path) in enumerate(zip(uris, resolved)):
+            if self.with_size or self.thumbnail_size is not None:
+                self._submit(self._process, futures[index], index, uri, path)
+            else:
+                futures[index].set_result(PickedMedia(index, uri, path))
+
+    def _process(self, future, index, uri, path):
+        width = height = thumbnail = None
+        try:
+            if self.with_size:
+                width, height = self._image_size(uri, path)
+            if self.thumbnail_size is not None:
+                thumbnail = self._thumbnail(uri, path)
+        except Exception as e:
+            # a bad item must not keep on_complete from running
+            Logger.debug(f"Kvdroid: could not process {uri.toString()}: {e}")
+        future.set_result(PickedMedia(index, uri, path, width, height, thumbnail))
+
+    @staticmethod
+    def _image_size(uri, path):
+        try:
+            with (open(path, "rb") if path else open_content(uri)) as file:
+                width, height = get_image_size_from_bytes(file.read(_HEADER_BYTES))
+            if width is not None:
+                return width, height
+        except Exception as e:
+            Logger.debug(f"Kvdroid: could not parse the header of {uri.toString()}: {e}")
+        resolver = activity.getContentResolver()
+        try:
+            if (resolver.getType(uri) or "").startswith("video/"):
+                retriever = MediaMetadataRetriever(instantiate=True)
+                try:
+                    retriever.setDataSource(activity, uri)
+                    width = retriever.extractMetadata(MediaMetadataRetriever().METADATA_KEY_VIDEO_WIDTH)
+                    height = retriever.extractMetadata(MediaMetadataRetriever().METADATA_KEY_VIDEO_HEIGHT)
+                finally:
+                    retriever.release()
+                if width and height:
+                    return int(width), int(height)
+                return None, None
+            # HEIC, WebP...: only the bounds are decoded, not the pixels
+            options = BitmapFactoryOptions(instantiate=True)
+            options.inJustDecodeBounds = True
+            stream = resolver.openInputStream(uri)
+            try:
+                BitmapFactory.decodeStream(stream, None, options)
+            finally:
+                stream.close()
+            if options.outWidth > 0 and options.outHeight > 0:
+                return options.outWidth, options.outHeight
+        except JavaException as e:
+            Logger.debug(f"Kvdroid: could not read the size of {uri.toString()}: {e}")
+        return None, None
+
+    def _thumbnail(self, uri, path):
+        width, height = self.thumbnail_size
+        try:
+            if VERSION().SDK_INT >= 29:
+                return activity.getContentResolver().loadThumbnail(uri, Size(width, height), None)
+            if path:
+                options = BitmapFactoryOptions(instantiate=True)
+                options.inJustDecodeBounds = True
+                BitmapFactory.decodeFile(path, options)
+                sample_size = 1
+                while (
+                    options.outWidth // (sample_size * 2) >= width
+                    and options.outHeight // (sample_size * 2) >= height
+                ):
+                    sample_size *= 2
+                options.inSampleSize = sample_size
+                options.inJustDecodeBounds = False
+                return BitmapFactory.decodeFile(path, options)
+        except JavaException as e:
+            Logger.debug(f"Kvdroid: could not load a thumbnail of {uri.toString()}: {e}")
+        return None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+picker_pipeline = PickerPipeline()
+
 _selection_single_code = None
 _selection_multiple_code = None
 _callback: Callable = lambda *_: None
+_on_result: Callable = None
+_pipeline: PickerPipeline = picker_pipeline
+
+
+_pick_images_max_limit = None
 
 
 def get_pick_images_max_limit():
-    if VERSION().SDK_INT >= 33:
-        return MediaStore().getPickImagesMaxLimit()
-    if VERSION().SDK_INT >= 30:
-        if SdkExtensions().getExtensionVersion(VERSION_CODES().R) >= 2:
-            return MediaStore().getPickImagesMaxLimit()
-    return 100
+    """Most items the photo picker lets the user select. Queried once, then cached."""
+    global _pick_images_max_limit
+    if _pick_images_max_limit is None:
+        _pick_images_max_limit = MediaStore().getPickImagesMaxLimit() if is_photo_picker_available() else 100
+    return _pick_images_max_limit
 
 
 def is_photo_picker_available():
@@ -89,14 +343,33 @@ def is_photo_picker_available():
     return False
 
 
-def action_pick_image(callback, pick_max=get_pick_images_max_limit(), multiple: bool = False):
-    global _selection_single_code, _selection_multiple_code, _callback
+def action_pick_image(
+        callback,
+        pick_max: int = None,
+        multiple: bool = False,
+        on_result: Callable = None,
+        pipeline: PickerPipeline = None,
+):
+    """
+    Pick images with ``MediaStore.ACTION_PICK_IMAGES``.
+
+    The result is processed on ``pipeline`` (:data:`picker_pipeline` by
+    default), off the UI thread. ``callback`` receives the resolved path, or
+    the list of paths when ``multiple``. ``on_result``, if given, receives
+    each :class:`PickedMedia` as soon as it is ready. ``pick_max`` defaults to
+    :func:`get_pick_images_max_limit`.
+    """
+    global _selection_single_code, _selection_multiple_code, _callback, _on_result, _pipeline
     _selection_single_code = randint(12345, 654321)
     _selection_multiple_code = randint(654321, 754321)
     _callback = callback
+    _on_result = on_result
+    _pipeline = pipeline or picker_pipeline
     if is_photo_picker_available():
         intent = Intent(MediaStore().ACTION_PICK_IMAGES)
         if multiple:
+            if pick_max is None:
+                pick_max = get_pick_images_max_limit()
             intent.putExtra(MediaStore().EXTRA_PICK_IMAGES_MAX, pick_max)
         activity.startActivityForResult(intent, _selection_multiple_code if multiple else _selection_single_code)
     else:
@@ -114,16 +387,14 @@ def _on_activity_result(request_code, result_code, data):
     if result_code != Activity().RESULT_OK:
         return
 
+    callback = _callback
     if request_code == _selection_multiple_code:
         # Process multiple URI if multiple files selected
-        selection = [
-            resolve_uri(
-                data.getClipData().getItemAt(count).getUri()
-            ) for count in range(data.getClipData().getItemCount())
-        ]
-        _callback(selection)
+        clip_data = data.getClipData()
+        uris = [clip_data.getItemAt(count).getUri() for count in range(clip_data.getItemCount())]
+        _pipeline.process(uris, _on_result, lambda items: callback([item.path for item in items]))
     else:
-        _callback(resolve_uri(data.getData()))
+        _pipeline.process([data.getData()], _on_result, lambda items: callback(items[0].path))
 
 
 act.bind(on_activity_result=_on_activity_result)
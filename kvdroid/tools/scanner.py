@@ -0,0 +1,255 @@
+"""
+Fast file listing of external storage.
+
+``os.walk`` over ``/sdcard`` goes through FUSE for every directory and stat
+call, which takes minutes on large storage under scoped storage.
+``DirectoryScanner`` answers from the MediaStore files table for media
+files, since that table is indexed. Otherwise it lists directories with
+``os.scandir`` on a thread pool. Results are streamed as they are found.
+With an index file, directories whose modification time did not change
+since the last scan are not listed again.
+"""
+
+__all__ = ("DirectoryScanner", "ScanEntry", "scan")
+
+import json
+import mimetypes
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatch
+from threading import RLock
+from typing import Iterator, NamedTuple
+
+from jnius import JavaException
+
+from kvdroid import Logger
+from kvdroid.jclass.android import MediaStoreFiles
+from kvdroid.tools.path import paths
+from kvdroid.tools.uri import query_cursor
+
+# mime types the MediaStore indexes, outside the folders it never scans
+_MEDIA_MIME_TYPES = ("image/", "video/", "audio/")
+
+
+class ScanEntry(NamedTuple):
+    path: str
+    size: int
+    modified: float
+    mime_type: str = None
+
+
+def _mime_type(path):
+    return mimetypes.guess_type(path)[0]
+
+
+def _depth(root, path):
+    # directory level of a file, 0 for the files directly in root
+    relative = os.path.relpath(os.path.dirname(path), root)
+    return 0 if relative == os.curdir else relative.count(os.sep) + 1
+
+
+class DirectoryScanner(object):
+    """
+    Lists files under a directory, from the MediaStore or the file system.
+
+    Args:
+        max_workers (int): Threads listing directories on the file system path.
+        index_path (str, optional): JSON file keeping each scanned directory's
+            listing and modification time. A later scan reuses the listing of
+            every directory whose modification time is unchanged. The index
+            only notices files being added, removed or renamed, not edited in
+            place.
+
+    Example:
+        >>> from kvdroid.tools.scanner import DirectoryScanner
+        >>> scanner = DirectoryScanner(index_path=os.path.join(paths.files, "scan.json"))
+        >>> for entry in scanner.scan(paths.sdcard, mime_types=["image/*"], max_depth=4):
+        ...     print(entry.path, entry.size)
+    """
+
+    def __init__(self, max_workers: int = 4, index_path: str = None):
+        self.max_workers = max_workers
+        self.index_path = index_path
+        self._lock = RLock()
+        self._index = None
+
+    def scan(
+            self,
+            root: str = None,
+            max_depth: int = None,
+            mime_types=None,
+            include_hidden: bool = False,
+            source: str = "auto",
+    ) -> Iterator[ScanEntry]:
+        """
+        Yield the files under ``root`` as :class:`ScanEntry` tuples, unordered.
+
+        Args:
+            root (str, optional): Directory to scan, the sdcard by default.
+            max_depth (int, optional): Deepest directory level to descend to,
+                0 being ``root`` itself. Unlimited by default.
+            mime_types (Iterable[str], optional): Mime type patterns to keep,
+                e.g. ``["image/*", "application/pdf"]``.
+            include_hidden (bool): Also list dot files and directories.
+            source (str): ``"media_store"``, ``"filesystem"`` or ``"auto"``.
+                The MediaStore never indexes ``.nomedia`` trees,
+                ``Android/data`` and ``Android/obb``, and misses files the
+                media scanner has not reached yet, whatever the permissions.
+                ``"auto"`` therefore only uses it under the sdcard when
+                nothing but image, video and audio types are requested, and
+                lists the file system otherwise. ``"media_store"`` forces the
+                fast path when these gaps are acceptable.
+        """
+        root = os.path.abspath(root or paths.sdcard)
+        mime_types = tuple(mime_types) if mime_types else None
+        if source not in ("auto", "media_store", "filesystem"):
+            raise ValueError(f"Unknown scan source {source!r}")
+        if source == "media_store" or (source == "auto" and self._media_store_complete(root, mime_types)):
+            entries = self._scan_media_store(root, max_depth, mime_types, include_hidden)
+            try:
+                # runs the query; only a failure before anything was yielded
+                # can fall back without repeating entries
+                first = next(entries, None)
+            except JavaException as e:
+                if source == "media_store":
+                    raise
+                Logger.debug(f"Kvdroid: MediaStore scan of {root} failed, listing files instead: {e}")
+            else:
+                if first is not None:
+                    yield first
+                    yield from entries
+                return
+        yield from self._scan_filesystem(root, max_depth, mime_types, include_hidden)
+
+    @staticmethod
+    def _media_store_complete(root, mime_types):
+        sdcard = paths.sdcard.rstrip("/")
+        if not (root == sdcard or root.startswith(sdcard + "/")):
+            return False
+        return mime_types is not None and all(
+            pattern.startswith(_MEDIA_MIME_TYPES) for pattern in mime_types
+        )
+
+    def _scan_media_store(self, root, max_depth, mime_types, include_hidden):
+        prefix = root.rstrip("/") + "/"
+        # an exact prefix match: LIKE would treat _ and % in folder names as
+        # wildcards and ignore case
+        selection = [f"substr(_data, 1, {len(prefix)}) = ?", "(format IS NULL OR format != ?)"]
+        # 0x3001 is MTP_FORMAT_ASSOCIATION, i.e. a directory
+        args = [prefix, "12289"]
+        if mime_types:
+            selection.append("(" + " OR ".join("mime_type LIKE ?" for _ in mime_types) + ")")
+            args.extend(pattern.replace("*", "%") for pattern in mime_types)
+        with query_cursor(
+                MediaStoreFiles().getContentUri("external"),
+                ["_data", "_size", "date_modified", "mime_type"],
+                " AND ".join(selection),
+                args,
+                None,
+        ) as cursor:
+            if cursor is None:
+                return
+            while cursor.moveToNext():
+                path = cursor.getString(0)
+                if path is None:
+                    continue
+                if max_depth is not None and _depth(root, path) > max_depth:
+                    continue
+                if not include_hidden and "/." in path[len(root):]:
+                    continue
+                yield ScanEntry(path, cursor.getLong(1), float(cursor.getLong(2)), cursor.getString(3))
+
+    def _scan_filesystem(self, root, max_depth, mime_types, include_hidden):
+        index = self._load_index()
+        updates = {}
+        executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="kvdroid-scanner")
+        pending = {executor.submit(self._list, root, index.get(root)): (root, 0)}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory, depth = pending.pop(future)
+                    try:
+                        listing = future.result()
+                    except OSError as e:
+                        Logger.debug(f"Kvdroid: could not list {directory}: {e}")
+                        continue
+                    updates[directory] = listing
+                    if max_depth is None or depth < max_depth:
+                        for name in listing["dirs"]:
+                            if include_hidden or not name.startswith("."):
+                                child = os.path.join(directory, name)
+                                pending[executor.submit(self._list, child, index.get(child))] = (child, depth + 1)
+                    for name, size, modified in listing["files"]:
+                        if not include_hidden and name.startswith("."):
+                            continue
+                        path = os.path.join(directory, name)
+                        mime_type = _mime_type(name)
+                        if mime_types and not (
+                                mime_type and any(fnmatch(mime_type, pattern) for pattern in mime_types)
+                        ):
+                            continue
+                        yield ScanEntry(path, size, modified, mime_type)
+        finally:
+            # the caller may stop iterating early, drop the queued listings
+            executor.shutdown(wait=False, cancel_futures=True)
+        # only reached once the generator is exhausted
+        self._save_index(updates)
+
+    @staticmethod
+    def _list(directory, cached):
+        modified = os.stat(directory).st_mtime
+        if cached is not None and cached["mtime"] == modified:
+            return cached
+        files = []
+        dirs = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.name)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files.append((entry.name, stat.st_size, stat.st_mtime))
+                except OSError:
+                    continue
+        return {"mtime": modified, "dirs": dirs, "files": files}
+
+    def _load_index(self) -> dict:
+        with self._lock:
+            if self._index is None:
+                self._index = {}
+                if self.index_path and os.path.exists(self.index_path):
+                    try:
+                        with open(self.index_path) as file:
+                            self._index = json.load(file)
+                    except (OSError, ValueError) as e:
+                        Logger.debug(f"Kvdroid: ignoring unreadable scan index {self.index_path}: {e}")
+            return self._index
+
+    def _save_index(self, updates):
+        with self._lock:
+            self._index.update(updates)
+            if not self.index_path:
+                return
+            temporary = self.index_path + ".tmp"
+            try:
+                with open(temporary, "w") as file:
+                    json.dump(self._index, file)
+                os.replace(temporary, self.index_path)
+            except OSError as e:
+                Logger.debug(f"Kvdroid: could not write scan index {self.index_path}: {e}")
+
+    def clear_index(self):
+        with self._lock:
+            self._index = {}
+            if self.index_path and os.path.exists(self.index_path):
+                os.remove(self.index_path)
+
+
+_default_scanner = DirectoryScanner()
+
+
+def scan(root: str = None, max_depth: int = None, mime_types=None, include_hidden: bool = False) -> Iterator[ScanEntry]:
+    """Shortcut for :meth:`DirectoryScanner.scan` on a shared scanner without an index."""
+    return _default_scanner.scan(root, max_depth, mime_types, include_hidden)
@@ -1,12 +1,17 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from os.path import join
+from threading import RLock
+from time import monotonic
 
 from jnius import JavaException
 
-from kvdroid.jclass.android import PackageManager, Environment, DocumentsContract, ContentUris, Uri, Intent, \
+from kvdroid.jclass.android import PackageManager, Environment, DocumentsContract, ContentUris, Uri, \
     MediaStoreAudioMedia, MediaStoreImagesMedia, MediaStoreVideoMedia, MediaStoreFiles
 from kvdroid.jclass.java import Long
 from kvdroid.tools.path import sdcard, get_storage_volumes
-from kvdroid import activity
+from kvdroid import activity, Logger
 
 context = activity.getApplicationContext()
 
@@ -24,55 +29,316 @@ def revoke_uri_permission(uri, permissions):
     context.revokeUriPermission(uri, permissions)
 
 
+class ResolverStats(object):
+    """Counters of one resolver in a :class:`UriResolverRegistry`."""
+
+    __slots__ = ("calls", "successes", "misses", "failures", "total_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.successes = 0
+        self.misses = 0
+        self.failures = 0
+        self.total_time = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.calls if self.calls else 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_time * 1000 / self.calls if self.calls else 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "misses": self.misses,
+            "failures": self.failures,
+            "success_rate": self.success_rate,
+            "mean_ms": self.mean_ms,
+        }
+
+
+class UriResolverRegistry(object):
+    """
+    Resolves URIs to file paths through a chain of resolvers, with caching.
+
+    A resolver is a callable ``resolver(uri) -> path | None``. Resolvers
+    registered for the URI's authority are tried first, in order, then the
+    scheme resolvers (``content``, ``file``, ...). The first path returned
+    wins. A resolver that returns None or raises passes the URI on to the next
+    one; exceptions are logged, never printed.
+
+    Resolvers are identified by ``name``, which defaults to the function's
+    ``__name__``; lambdas must be given one.
+
+    Results are kept in an LRU keyed by the URI string. Failed resolutions are
+    only remembered for ``miss_ttl`` seconds, so a provider that was not
+    ready or a permission granted later is picked up. A resolver that keeps
+    raising for an authority (``failure_threshold`` times in a row) is
+    skipped for that authority for ``negative_ttl`` seconds.
+
+    Example:
+        >>> from kvdroid.tools.uri import uri_resolvers
+        >>> uri_resolvers.register_authority(
+        ...     "com.example.provider", lambda uri: "/data/" + uri.getLastPathSegment(),
+        ...     name="example_provider",
+        ... )
+        >>> uri_resolvers.stats()["media_documents"]["mean_ms"]
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 512,
+        negative_ttl: float = 300.0,
+        failure_threshold: int = 3,
+        miss_ttl: float = 10.0,
+    ):
+        self.cache_size = cache_size
+        self.miss_ttl = miss_ttl
+        self.negative_ttl = negative_ttl
+        self.failure_threshold = failure_threshold
+        self._lock = RLock()
+        self._authorities = {}
+        self._schemes = {}
+        self._stats = {}
+        self._cache = OrderedDict()
+        self._failures = {}
+
+    def register_authority(self, authority: str, resolver, name: str = None, first: bool = False):
+        """Add ``resolver`` for URIs of ``authority``, last in its chain or ``first``."""
+        self._register(self._authorities, authority, resolver, name, first)
+
+    def register_scheme(self, scheme: str, resolver, name: str = None, first: bool = False):
+        """Add ``resolver`` for every URI of ``scheme`` not resolved by its authority."""
+        self._register(self._schemes, scheme.lower(), resolver, name, first)
+
+    def _register(self, chains, key, resolver, name, first):
+        name = name or getattr(resolver, "__name__", repr(resolver))
+        if name == "<lambda>":
+            # every lambda has this name, they would share stats and unregister()
+            raise ValueError("A name is required to register a lambda resolver")
+        with self._lock:
+            chain = [entry for entry in chains.get(key, ()) if entry[0] != name]
+            chain.insert(0 if first else len(chain), (name, resolver))
+            chains[key] = tuple(chain)
+            self._stats.setdefault(name, ResolverStats())
+            self._cache.clear()
+
+    def unregister(self, name: str):
+        with self._lock:
+            for chains in (self._authorities, self._schemes):
+                for key, chain in list(chains.items()):
+                    chains[key] = tuple(entry for entry in chain if entry[0] != name)
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        """Per-resolver calls, success rate and mean latency."""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def cache_clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._failures.clear()
+            _failing_download_uris.clear()
+
+    def resolve(self, uri):
+        key = uri.toString()
+        found, path = self._cached(key)
+        if found:
+            return path
+        authority = uri.getAuthority()
+        scheme = (uri.getScheme() or "").lower()
+        path = None
+        for name, resolver in self._authorities.get(authority, ()) + self._schemes.get(scheme, ()):
+            if self._skipped(name, authority):
+                continue
+            path = self._run(name, resolver, uri, authority)
+            if path:
+                break
+        self._store(key, path)
+        return path or None
+
+    def is_cached(self, uri) -> bool:
+        return self._cached(uri.toString())[0]
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return False, None
+            path, expires = entry
+            if expires is not None and monotonic() >= expires:
+                del self._cache[key]
+                return False, None
+            self._cache.move_to_end(key)
+            return True, path
+
+    def prime(self, uri, path: str):
+        """Cache ``path`` for ``uri``, e.g. from a bulk query, without running resolvers."""
+        self._store(uri.toString(), path)
+
+    def _store(self, key, path):
+        with self._lock:
+            self._cache[key] = (path, None) if path else (None, monotonic() + self.miss_ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _skipped(self, name, authority):
+        # resolve_uris() runs resolve() from several threads
+        with self._lock:
+            failure = self._failures.get((name, authority))
+            if failure is None or failure[0] < self.failure_threshold:
+                return False
+            if monotonic() - failure[1] < self.negative_ttl:
+                return True
+            self._failures.pop((name, authority), None)
+            return False
+
+    def _run(self, name, resolver, uri, authority):
+        stats = self._stats[name]
+        start = monotonic()
+        try:
+            path = resolver(uri)
+        except Exception as e:
+            Logger.debug(f"Kvdroid: URI resolver {name} failed for {authority}: {e}")
+            with self._lock:
+                stats.calls += 1
+                stats.failures += 1
+                stats.total_time += monotonic() - start
+                count = self._failures.get((name, authority), (0, 0))[0] + 1
+                self._failures[(name, authority)] = (count, monotonic())
+            return None
+        with self._lock:
+            stats.calls += 1
+            stats.total_time += monotonic() - start
+            if path:
+                stats.successes += 1
+            else:
+                stats.misses += 1
+            self._failures.pop((name, authority), None)
+        return path
+
+
+MEDIA_DOCUMENTS_AUTHORITY = 'com.android.providers.media.documents'
+
+
+def _resolve_media_documents(uri):
+    file_name, selection, content_uri = handle_media_documents(uri)
+    return parse_content(
+        uri=content_uri, projection=['_data'], selection=selection,
+        selection_args=[file_name], sort_order=None
+    )
+
+
+def _resolve_content(uri):
+    return parse_content(
+        uri=uri, projection=['_data'], selection=None,
+        selection_args=None, sort_order=None
+    )
+
+
+def _resolve_file(uri):
+    return uri.getPath()
+
+
+uri_resolvers = UriResolverRegistry()
+uri_resolvers.register_authority(
+    'com.android.externalstorage.documents', lambda uri: handle_external_documents(uri),
+    name="external_documents"
+)
+# in case a user selects a file from 'Downloads' section
+# note: this won't be triggered if a user selects a path directly
+#       e.g.: Phone -> Download -> <some file>
+uri_resolvers.register_authority(
+    'com.android.providers.downloads.documents', lambda uri: handle_downloads_documents(uri),
+    name="downloads_documents"
+)
+uri_resolvers.register_authority(
+    MEDIA_DOCUMENTS_AUTHORITY, _resolve_media_documents,
+    name="media_documents"
+)
+# parse content:// scheme to path
+uri_resolvers.register_scheme('content', _resolve_content, name="content")
+# nothing to parse, file:// will return a proper path
+uri_resolvers.register_scheme('file', _resolve_file, name="file")
+
+
 def resolve_uri(uri):
     """
     Resolve URI input from ``android.app.Activity.onActivityResult()``.
+
+    Goes through :data:`uri_resolvers`, so repeated URIs are served from its cache.
     """
+    return uri_resolvers.resolve(uri)
 
-    uri_authority = uri.getAuthority()
-    uri_scheme = uri.getScheme().lower()
 
-    path = None
-    file_name = None
-    selection = None
-    downloads = None
-
-    # This does not allow file selected from google photos or gallery
-    # or even any other file explorer to work
-    # not a document URI, nothing to convert from
-    # if not DocumentsContract.isDocumentUri(mActivity, uri):
-    #     return path
-
-    if uri_authority == 'com.android.externalstorage.documents':
-        return handle_external_documents(uri)
-
-    # in case a user selects a file from 'Downloads' section
-    # note: this won't be triggered if a user selects a path directly
-    #       e.g.: Phone -> Download -> <some file>
-    elif uri_authority == 'com.android.providers.downloads.documents':
-        path = downloads = handle_downloads_documents(uri)
-
-    elif uri_authority == 'com.android.providers.media.documents':
-        file_name, selection, uri = handle_media_documents(uri)
-
-    # parse content:// scheme to path
-    if uri_scheme == 'content' and not downloads:
-        try:
-            path = parse_content(
-                uri=uri, projection=['_data'], selection=selection,
-                selection_args=file_name, sort_order=None
-            )
-        except JavaException:  # handles array error for selection_args
-            path = parse_content(
-                uri=uri, projection=['_data'], selection=selection,
-                selection_args=[file_name], sort_order=None
-            )
-
-    # nothing to parse, file:// will return a proper path
-    elif uri_scheme == 'file':
-        path = uri.getPath()
+def resolve_uris(uris, max_workers: int = 4) -> list:
+    """
+    Resolve many URIs in parallel, e.g. a multi-select picker result.
 
-    return path
+    Returns:
+        list: The paths, in the order of ``uris``; None for unresolved ones.
+    """
+    uris = list(uris)
+    _prime_media_documents(uris)
+    if len(uris) < 2:
+        return [resolve_uri(uri) for uri in uris]
+    with ThreadPoolExecutor(min(max_workers, len(uris))) as executor:
+        return list(executor.map(resolve_uri, uris))
+
+
+def _prime_media_documents(uris):
+    # one `_id IN (...)` query per MediaStore collection instead of one
+    # query per picked file; misses go through the resolver chain as usual
+    collections = {}
+    for uri in uris:
+        if uri.getAuthority() != MEDIA_DOCUMENTS_AUTHORITY or uri_resolvers.is_cached(uri):
+            continue
+        try:
+            file_id, _, content_uri = handle_media_documents(uri)
+        except (JavaException, ValueError):
+            continue
+        collection = collections.setdefault(content_uri.toString(), (content_uri, {}))
+        collection[1][file_id] = uri
+    for content_uri, by_id in collections.values():
+        if len(by_id) < 2:
+            continue
+        try:
+            paths = parse_content_bulk(content_uri, by_id)
+        except JavaException as e:
+            Logger.debug(f"Kvdroid: bulk query of {content_uri.toString()} failed: {e}")
+            continue
+        for file_id, uri in by_id.items():
+            if paths.get(file_id):
+                uri_resolvers.prime(uri, paths[file_id])
+
+
+# known locations, differ between machines
+_DOWNLOAD_URIS = (
+    'content://downloads/public_downloads',
+    'content://downloads/my_downloads',
+
+    # all_downloads requires separate permission
+    # android.permission.ACCESS_ALL_DOWNLOADS
+    'content://downloads/all_downloads'
+)
+# download locations that raised on this device, with the time they last
+# did; skipped until uri_resolvers.negative_ttl has passed
+_failing_download_uris = {}
+
+
+def _download_uri_failing(down):
+    failed_at = _failing_download_uris.get(down)
+    if failed_at is None:
+        return False
+    if monotonic() - failed_at < uri_resolvers.negative_ttl:
+        return True
+    _failing_download_uris.pop(down, None)
+    return False
 
 
 def handle_downloads_documents(uri):
@@ -114,44 +380,36 @@ def handle_downloads_documents(uri):
         )
         return join(download_dir, path)
 
-    except Exception:
-        import traceback
-        traceback.print_exc()
-
-    # known locations, differ between machines
-    downloads = [
-        'content://downloads/public_downloads',
-        'content://downloads/my_downloads',
-
-        # all_downloads requires separate permission
-        # android.permission.ACCESS_ALL_DOWNLOADS
-        'content://downloads/all_downloads'
-    ]
+    except Exception as e:
+        Logger.debug(f"Kvdroid: could not read download display name: {e}")
 
     file_id = DocumentsContract().getDocumentId(uri)
     try_uris = [
-        ContentUris().withAppendedId(
+        (down, ContentUris().withAppendedId(
             Uri().parse(down), Long().valueOf(file_id)
-        )
-        for down in downloads
+        ))
+        for down in _DOWNLOAD_URIS
+        if not _download_uri_failing(down)
     ]
 
     # try all known Download folder uris
     # and handle JavaExceptions due to different locations
     # for content:// downloads or missing permission
     path = None
-    for down in try_uris:
+    for down, content_uri in try_uris:
         try:
             path = parse_content(
-                uri=down, projection=['_data'],
+                uri=content_uri, projection=['_data'],
                 selection=None,
                 selection_args=None,
                 sort_order=None
             )
 
-        except JavaException:
-            import traceback
-            traceback.print_exc()
+        except JavaException as e:
+            # unknown location or missing permission: it will likely fail
+            # the same way for the next files, stop trying it for a while
+            Logger.debug(f"Kvdroid: {down} is not readable: {e}")
+            _failing_download_uris[down] = monotonic()
 
         # we got a path, ignore the rest
         if path:
@@ -160,19 +418,21 @@ def handle_downloads_documents(uri):
     # alternative approach to Downloads by joining
     # all data items from Activity result
     if not path:
-        for down in try_uris:
+        for down, content_uri in try_uris:
+            if _download_uri_failing(down):
+                continue
             try:
                 path = parse_content(
-                    uri=down, projection=None,
+                    uri=content_uri, projection=None,
                     selection=None,
                     selection_args=None,
                     sort_order=None,
                     index_all=True
                 )
 
-            except JavaException:
-                import traceback
-                traceback.print_exc()
+            except JavaException as e:
+                Logger.debug(f"Kvdroid: {down} is not readable: {e}")
+                _failing_download_uris[down] = monotonic()
 
             # we got a path, ignore the rest
             if path:
@@ -231,6 +491,29 @@ def handle_media_documents(uri):
     return file_name, selection, uri
 
 
+@contextmanager
+def query_cursor(uri, projection=None, selection=None, selection_args=None, sort_order=None):
+    """
+    Query the content resolver and close the cursor on exit.
+
+    Yields:
+        android.database.Cursor: The cursor, or None if the provider returned none.
+
+    Example:
+        >>> with query_cursor(uri, ["_display_name"]) as cursor:
+        ...     if cursor is not None and cursor.moveToFirst():
+        ...         print(cursor.getString(0))
+    """
+    cursor = activity.getContentResolver().query(
+        uri, projection, selection, selection_args, sort_order
+    )
+    try:
+        yield cursor
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+
 def parse_content(
         uri, projection, selection, selection_args, sort_order,
         index_all=False
@@ -239,36 +522,48 @@ def parse_content(
     Parser for ``content://`` URI returned by some Android resources.
     """
 
-    result = None
-    resolver = activity.getContentResolver()
-    read = Intent().FLAG_GRANT_READ_URI_PERMISSION
-    write = Intent().FLAG_GRANT_READ_URI_PERMISSION
-    persist = Intent().FLAG_GRANT_READ_URI_PERMISSION
-
-    # grant permission for our activity
-    activity.grantUriPermission(
-        activity.getPackageName(),
-        uri,
-        read | write | persist
-    )
+    with query_cursor(uri, projection, selection, selection_args, sort_order) as cursor:
+        if cursor is None:
+            return None
 
-    if not index_all:
-        cursor = resolver.query(
-            uri, projection, selection,
-            selection_args, sort_order
-        )
+        if not index_all:
+            idx = cursor.getColumnIndex(projection[0])
+            if idx != -1 and cursor.moveToFirst():
+                return cursor.getString(idx)
+            return None
 
-        idx = cursor.getColumnIndex(projection[0])
-        if idx != -1 and cursor.moveToFirst():
-            result = cursor.getString(idx)
-    else:
         result = []
-        cursor = resolver.query(
-            uri, projection, selection,
-            selection_args, sort_order
-        )
         while cursor.moveToNext():
             for idx in range(cursor.getColumnCount()):
                 result.append(cursor.getString(idx))
-        result = '/'.join(result)
+        return '/'.join(result)
+
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER on older Android releases
+SQLITE_MAX_VARIABLES = 999
+
+
+def parse_content_bulk(uri, ids, column: str = '_data', id_column: str = '_id') -> dict:
+    """
+    Read ``column`` of many rows of one collection with ``_id IN (...)`` queries.
+
+    Args:
+        uri (android.net.Uri): The collection, e.g. ``MediaStoreImagesMedia().EXTERNAL_CONTENT_URI``.
+        ids (Iterable): Row IDs. Queried in chunks of :data:`SQLITE_MAX_VARIABLES`.
+        column (str): Column to read.
+        id_column (str): Column holding the row IDs.
+
+    Returns:
+        dict: ``{id: value}`` with IDs as strings. Rows not found are left out.
+    """
+    ids = list(dict.fromkeys(str(row_id) for row_id in ids))
+    result = {}
+    for start in range(0, len(ids), SQLITE_MAX_VARIABLES):
+        chunk = ids[start:start + SQLITE_MAX_VARIABLES]
+        selection = f"{id_column} IN ({','.join('?' * len(chunk))})"
+        with query_cursor(uri, [id_column, column], selection, chunk) as cursor:
+            if cursor is None:
+                continue
+            while cursor.moveToNext():
+                result[cursor.getString(0)] = cursor.getString(1)
     return result